@@ -4,13 +4,17 @@ Run:  uvicorn app.api:app --reload --port 8000
 """
 from __future__ import annotations
 
+import asyncio
+import os
+import re
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
-from app import db, rags, settings
+from app import db, metrics, profiling, rags, settings
 from app.schemas import (
     AccountIn,
     AccountUpdate,
@@ -18,7 +22,7 @@ from app.schemas import (
     PublishRequest,
     SettingsIn,
 )
-from app.services import generator, news
+from app.services import generator, hosting, ingest, news, prewarm, reservoir, retention
 from app.services.instagram import InstagramError
 from app.services.llm import LLMError
 
@@ -27,7 +31,16 @@ from app.services.llm import LLMError
 async def lifespan(app: FastAPI):
     db.init_db()
     rags.seed_from_env()
+    tasks = [
+        asyncio.create_task(hosting.sync_forever(settings.HOSTING_SYNC_INTERVAL)),
+        asyncio.create_task(ingest.ingest_forever(settings.NEWS_INGEST_INTERVAL)),
+        asyncio.create_task(retention.gc_forever(settings.PREVIEW_GC_INTERVAL)),
+        asyncio.create_task(reservoir.refill_forever(settings.RESERVOIR_INTERVAL)),
+        asyncio.create_task(prewarm.prewarm_forever(settings.WARM_INTERVAL)),
+    ]
     yield
+    for task in tasks:
+        task.cancel()
 
 
 app = FastAPI(title="Instagram Automation", version="4.0.0", lifespan=lifespan)
@@ -42,8 +55,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class CdnFiles(StaticFiles):
+    """StaticFiles (ETag, Last-Modified, Range) plus Cache-Control: content-
+    hashed names never change, so browsers may keep them forever; anything
+    else must revalidate (a cheap 304 via ETag)."""
+
+    _HASHED = re.compile(r"^[0-9a-f]{20}\.(?:webp|jpe?g|png)$")
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        retention.touch(full_path)
+        if self._HASHED.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
 # Serve locally-rendered previews (before they are pushed to GitHub on publish).
-app.mount("/cdn", StaticFiles(directory=str(settings.IMAGES_DIR)), name="cdn")
+app.mount("/cdn", CdnFiles(directory=str(settings.IMAGES_DIR)), name="cdn")
 
 
 @app.get("/api/health")
@@ -53,9 +83,20 @@ def health():
         "openai_key_set": bool(settings.OPENAI_API_KEY),
         "model": settings.OPENAI_MODEL,
         "niches": list(settings.NICHES),
+        "hosting": hosting.status(),
+        "previews": retention.status(),
+        "reservoir": reservoir.status(),
+        "warm": prewarm.status(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus scrape target: per-stage latency histograms, error counts,
+    LLM token usage and cache hit rates (see app/metrics.py)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ===================== ACCOUNTS (rags) =====================
 
 @app.get("/api/accounts")
@@ -104,9 +145,14 @@ def update_settings(body: SettingsIn):
 # ===================== GENERATION =====================
 
 @app.post("/api/generate")
-async def generate(body: GenerateRequest):
+async def generate(body: GenerateRequest, profile: bool = False,
+                   x_profile: str | None = Header(None)):
+    # Opt-in sampling profile of this request only (?profile=1 or X-Profile: 1).
+    profiler = None
+    if profile or (x_profile or "").strip().lower() in ("1", "true", "yes"):
+        profiler = profiling.SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000).start()
     try:
-        return await generator.generate(
+        batch = await generator.generate(
             niche=body.niche, posts=body.posts, slides=body.slides, topic=body.topic
         )
     except LLMError as exc:
@@ -114,6 +160,13 @@ async def generate(body: GenerateRequest):
     except Exception as exc:  # noqa: BLE001
         import traceback; traceback.print_exc()
         raise HTTPException(500, str(exc))
+    finally:
+        if profiler is not None:
+            await asyncio.to_thread(profiler.stop)  # joins the sampler thread
+    if profiler is not None:
+        profiler.save(batch["batch_id"])
+        batch["profile_url"] = f"/api/batch/{batch['batch_id']}/profile"
+    return batch
 
 
 @app.get("/api/batch/{batch_id}")
@@ -124,6 +177,15 @@ def get_batch(batch_id: str):
     return batch
 
 
+@app.get("/api/batch/{batch_id}/profile")
+def get_batch_profile(batch_id: str):
+    """Download a batch's profile (folded stacks: flamegraph.pl / speedscope)."""
+    path = profiling.profile_path(batch_id) if batch_id.isalnum() else None
+    if not path:
+        raise HTTPException(404, "No profile recorded for this batch")
+    return FileResponse(path, media_type="text/plain", filename=f"generate_{batch_id}.folded")
+
+
 @app.post("/api/publish")
 def publish(body: PublishRequest):
     try:
@@ -2,15 +2,24 @@
 
 UI-editable settings live in the rags store; this file is for the deeper
 styling/generation knobs the old project exposed through `config.json`:
-overlay look, quote word limits, hashtag counts, dedup depth. Missing keys
+overlay look, quote word limits, hashtag counts, dedup depth, slide encoding. Missing keys
 fall back to these defaults, so `config.json` is entirely optional.
+
+The merged config is cached and handed out as a read-only view (dicts become
+`MappingProxyType`, lists become tuples). Each call only `stat()`s the file;
+it is re-read and re-merged when its mtime or size changes, so edits still
+apply on the next generation without a restart.
 """
 from __future__ import annotations
 
 import json
+import os
+import threading
 from collections.abc import Mapping
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Optional, Tuple
 
+from app import metrics
 from app.settings import BASE_DIR, DEFAULT_HANDLE
 
 CONFIG_FILE = BASE_DIR / "config.json"
@@ -31,6 +40,14 @@ DEFAULTS: Dict[str, Any] = {
         "darkness": 0.42,       # 0..1 background dim for legibility
         "text_color": "#ffffff",
     },
+    "encoding": {
+        "max_bytes": 300_000,   # per-slide JPEG budget; quality is searched down to fit
+        "max_quality": 92,
+        "min_quality": 75,      # never go below this, even if over budget
+        "progressive": True,
+        "preview_width": 540,   # WebP derivative the Studio shows (0 = serve the JPEG)
+        "preview_quality": 70,
+    },
 }
 
 
@@ -44,13 +61,42 @@ def _deep_merge(base: dict, override: Mapping) -> dict:
     return out
 
 
-def load_config() -> Dict[str, Any]:
-    """Re-read on each call so edits to config.json apply without a restart."""
-    cfg = json.loads(json.dumps(DEFAULTS))  # deep copy
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                cfg = _deep_merge(cfg, json.load(f))
-        except Exception as exc:  # noqa: BLE001
-            print(f"[config] failed to read config.json: {exc}; using defaults")
-    return cfg
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+_lock = threading.Lock()
+_cached: Optional[Mapping[str, Any]] = None
+_signature: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the cached read
+
+
+def _file_signature() -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_config() -> Mapping[str, Any]:
+    """Merged config as an immutable view; re-read only when config.json changes."""
+    global _cached, _signature
+    sig = _file_signature()
+    with _lock:
+        if _cached is not None and sig == _signature:
+            metrics.cache("config", True)
+            return _cached
+        metrics.cache("config", False)
+        cfg: Dict[str, Any] = DEFAULTS
+        if sig is not None:
+            try:
+                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                    cfg = _deep_merge(DEFAULTS, json.load(f))
+            except Exception as exc:  # noqa: BLE001
+                print(f"[config] failed to read config.json: {exc}; using defaults")
+        _cached, _signature = _freeze(cfg), sig
+        return _cached
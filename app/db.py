@@ -1,9 +1,12 @@
 """SQLite layer: connection helper, schema, and published-post history.
 
-A single DB file (`posts.db`) holds three concerns:
+A single DB file (`posts.db`) holds these concerns:
   - `accounts`        : Instagram accounts + their Graph API creds  (rags)
   - `app_settings`    : misc keys (News API key, hosting overrides) (rags)
   - `published_posts` : history of what was actually posted
+  - `news_articles`   : locally ingested news items (+ `news_fts` FTS5 index)
+  - `used_backgrounds`: perceptual hashes of rendered backgrounds (bgindex)
+  - `preview_files`   : rendered preview files per batch (retention/GC)
 """
 from __future__ import annotations
 
@@ -14,6 +17,8 @@ from typing import Any, Dict, Iterator, List, Optional
 
 from app.settings import DB_FILE
 
+_HAS_FTS = False  # set by init_db() once the FTS5 index is known to exist
+
 
 @contextmanager
 def connect() -> Iterator[sqlite3.Connection]:
@@ -85,6 +90,104 @@ def init_db() -> None:
             )
             """
         )
+        # Ingested news (see services/ingest.py). `link` is the canonical link,
+        # `posted_at` marks stories already turned into a published post.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS news_articles (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                link         TEXT UNIQUE,
+                url          TEXT,
+                title        TEXT NOT NULL,
+                summary      TEXT,
+                source       TEXT,
+                topic        TEXT DEFAULT '',
+                published    TEXT,
+                published_ts REAL,
+                fetched_at   TEXT DEFAULT (datetime('now')),
+                posted_at    TEXT
+            )
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_news_fresh ON news_articles (posted_at, published_ts)"
+        )
+        _init_news_fts(cur)
+        # Backgrounds already rendered onto a slide (see services/bgindex.py).
+        # `url_key` is the size-independent image URL, `dhash` a 64-bit
+        # perceptual hash stored as a signed SQLite integer.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS used_backgrounds (
+                id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_key TEXT,
+                dhash   INTEGER NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_bg_used ON used_backgrounds (used_at)")
+        # Files in PREVIEWS_DIR, by name (see services/retention.py). `pinned`
+        # marks slides of a published post: never garbage-collected.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS preview_files (
+                name        TEXT PRIMARY KEY,
+                batch_id    TEXT,
+                bytes       INTEGER NOT NULL DEFAULT 0,
+                created_at  REAL NOT NULL,
+                accessed_at REAL,
+                pinned      INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Pre-generated quote posts waiting to be served (services/reservoir.py).
+        # `topic` is normalized ('' = no topic), `post` the normalized LLM post.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quote_reservoir (
+                id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic      TEXT NOT NULL DEFAULT '',
+                post       TEXT NOT NULL,
+                model      TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reservoir_topic ON quote_reservoir (topic, id)")
+
+
+def _init_news_fts(cur: sqlite3.Cursor) -> None:
+    """External-content FTS5 index over news titles/summaries, kept in step by
+    triggers. Builds without FTS5 simply skip it and search falls back to LIKE."""
+    global _HAS_FTS
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                title, summary, content='news_articles', content_rowid='id'
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS news_ai AFTER INSERT ON news_articles BEGIN
+                INSERT INTO news_fts(rowid, title, summary)
+                VALUES (new.id, new.title, new.summary);
+            END
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS news_ad AFTER DELETE ON news_articles BEGIN
+                INSERT INTO news_fts(news_fts, rowid, title, summary)
+                VALUES ('delete', old.id, old.title, old.summary);
+            END
+            """
+        )
+        _HAS_FTS = True
+    except sqlite3.OperationalError:
+        _HAS_FTS = False
 
 
 # ===================== PUBLISHED POSTS =====================
@@ -193,3 +296,249 @@ def get_used_quote_norms() -> set:
         cur = conn.cursor()
         cur.execute("SELECT norm FROM used_quotes")
         return {r[0] for r in cur.fetchall()}
+
+
+# ===================== NEWS ARTICLES (local ingest store) =====================
+
+def upsert_articles(items: List[Dict[str, Any]], topic: str = "") -> int:
+    """Insert new articles (keyed by canonical `link`); return how many were new."""
+    rows = [
+        (it["link"], it.get("url", ""), it["title"], it.get("summary", ""),
+         it.get("source", ""), topic, it.get("published", ""), it.get("published_ts"))
+        for it in items if it.get("link") and it.get("title")
+    ]
+    if not rows:
+        return 0
+    with connect() as conn:
+        cur = conn.executemany(
+            """INSERT OR IGNORE INTO news_articles
+                   (link, url, title, summary, source, topic, published, published_ts)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        return max(0, cur.rowcount)
+
+
+def _fts_query(text: str) -> str:
+    """Topic words as OR-ed quoted FTS5 terms (safe against FTS syntax)."""
+    words = [w for w in _re.findall(r"[a-z0-9]+", (text or "").lower()) if len(w) > 1]
+    return " OR ".join(f'"{w}"' for w in words)
+
+
+def fresh_articles(topic: Optional[str], limit: int, since_ts: float) -> List[Dict[str, Any]]:
+    """Unposted articles published after `since_ts`, best matches first.
+
+    With a topic: FTS5 relevance (bm25), ties broken by recency. Without one:
+    newest first.
+    """
+    query = _fts_query(topic or "")
+    with connect() as conn:
+        cur = conn.cursor()
+        if query and _HAS_FTS:
+            cur.execute(
+                """SELECT a.* FROM news_fts f JOIN news_articles a ON a.id = f.rowid
+                   WHERE news_fts MATCH ? AND a.posted_at IS NULL
+                     AND COALESCE(a.published_ts, 0) >= ?
+                   ORDER BY bm25(news_fts), a.published_ts DESC LIMIT ?""",
+                (query, since_ts, limit),
+            )
+        elif query:
+            like = f"%{(topic or '').strip().lower()}%"
+            cur.execute(
+                """SELECT * FROM news_articles
+                   WHERE posted_at IS NULL AND COALESCE(published_ts, 0) >= ?
+                     AND (lower(title) LIKE ? OR lower(summary) LIKE ?)
+                   ORDER BY published_ts DESC LIMIT ?""",
+                (since_ts, like, like, limit),
+            )
+        else:
+            cur.execute(
+                """SELECT * FROM news_articles
+                   WHERE posted_at IS NULL AND COALESCE(published_ts, 0) >= ?
+                   ORDER BY published_ts DESC LIMIT ?""",
+                (since_ts, limit),
+            )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def fresh_links(links: List[str], since_ts: float) -> set:
+    """The subset of `links` still unposted and published after `since_ts`."""
+    if not links:
+        return set()
+    with connect() as conn:
+        rows = conn.execute(
+            f"""SELECT link FROM news_articles
+                WHERE link IN ({','.join('?' * len(links))})
+                  AND posted_at IS NULL AND COALESCE(published_ts, 0) >= ?""",
+            [*links, since_ts],
+        ).fetchall()
+    return {r["link"] for r in rows}
+
+
+def mark_articles_posted(links: List[str]) -> None:
+    links = [l for l in links if l]
+    if not links:
+        return
+    with connect() as conn:
+        conn.executemany(
+            "UPDATE news_articles SET posted_at = datetime('now') WHERE link = ?",
+            [(l,) for l in links],
+        )
+
+
+def prune_articles(before_ts: float) -> int:
+    """Drop stale, never-posted articles so the store stays small."""
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM news_articles WHERE posted_at IS NULL AND COALESCE(published_ts, 0) < ?",
+            (before_ts,),
+        )
+        return cur.rowcount
+
+
+# ===================== used backgrounds =====================
+
+def _signed64(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def add_used_backgrounds(rows: List[tuple], used_at: float) -> None:
+    """Record (url_key, dhash) pairs; dhash is an unsigned 64-bit int."""
+    if not rows:
+        return
+    with connect() as conn:
+        conn.executemany(
+            "INSERT INTO used_backgrounds (url_key, dhash, used_at) VALUES (?, ?, ?)",
+            [(key, _signed64(h), used_at) for key, h in rows],
+        )
+
+
+def recent_backgrounds(since_ts: float) -> List[tuple]:
+    """(url_key, unsigned dhash) of every background used since `since_ts`."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT url_key, dhash FROM used_backgrounds WHERE used_at >= ?", (since_ts,)
+        ).fetchall()
+    return [(r["url_key"], r["dhash"] & 0xFFFFFFFFFFFFFFFF) for r in rows]
+
+
+def prune_backgrounds(before_ts: float) -> int:
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM used_backgrounds WHERE used_at < ?", (before_ts,))
+        return cur.rowcount
+
+
+# ===================== preview files =====================
+
+def track_previews(rows: List[tuple]) -> None:
+    """Register (name, batch_id, bytes, created_at) preview files. A name seen
+    again (identical content-hashed preview) moves to the newer batch."""
+    if not rows:
+        return
+    with connect() as conn:
+        conn.executemany(
+            """
+            INSERT INTO preview_files (name, batch_id, bytes, created_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                batch_id = excluded.batch_id, bytes = excluded.bytes,
+                created_at = excluded.created_at
+            """,
+            rows,
+        )
+
+
+def pin_previews(names: List[str]) -> None:
+    if not names:
+        return
+    with connect() as conn:
+        conn.executemany("UPDATE preview_files SET pinned = 1 WHERE name = ?",
+                         [(n,) for n in names])
+
+
+def touch_previews(accessed: Dict[str, float]) -> None:
+    if not accessed:
+        return
+    with connect() as conn:
+        conn.executemany(
+            "UPDATE preview_files SET accessed_at = MAX(COALESCE(accessed_at, 0), ?) WHERE name = ?",
+            [(ts, name) for name, ts in accessed.items()],
+        )
+
+
+def preview_rows() -> List[Dict[str, Any]]:
+    with connect() as conn:
+        rows = conn.execute("SELECT * FROM preview_files").fetchall()
+    return [dict(r) for r in rows]
+
+
+def batch_preview_names(batch_id: str) -> List[str]:
+    """Unpinned preview files registered to `batch_id`."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT name FROM preview_files WHERE batch_id = ? AND pinned = 0", (batch_id,)
+        ).fetchall()
+    return [r["name"] for r in rows]
+
+
+def forget_previews(names: List[str]) -> None:
+    if not names:
+        return
+    with connect() as conn:
+        conn.executemany("DELETE FROM preview_files WHERE name = ?", [(n,) for n in names])
+
+
+def published_file_names() -> set:
+    """File names (last URL segment) of every hosted slide in published_posts."""
+    names: set = set()
+    with connect() as conn:
+        for row in conn.execute("SELECT cover_url, slide_urls FROM published_posts"):
+            try:
+                urls = json.loads(row["slide_urls"] or "[]")
+            except (json.JSONDecodeError, TypeError):
+                urls = []
+            for url in [row["cover_url"], *urls]:
+                if url:
+                    names.add(str(url).rstrip("/").rsplit("/", 1)[-1])
+    return names
+
+
+# ===================== quote reservoir =====================
+
+def add_reservoir_posts(topic: str, posts: List[Dict[str, Any]], model: str, created_at: float) -> None:
+    if not posts:
+        return
+    with connect() as conn:
+        conn.executemany(
+            "INSERT INTO quote_reservoir (topic, post, model, created_at) VALUES (?, ?, ?, ?)",
+            [(topic, json.dumps(p), model, created_at) for p in posts],
+        )
+
+
+def reservoir_posts(topic: str) -> List[Dict[str, Any]]:
+    """Stored posts for `topic`, oldest first: [{"id", "post", "model"}]."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT id, post, model FROM quote_reservoir WHERE topic = ? ORDER BY id", (topic,)
+        ).fetchall()
+    return [{"id": r["id"], "post": json.loads(r["post"]), "model": r["model"]} for r in rows]
+
+
+def claim_reservoir_posts(ids: List[int]) -> List[int]:
+    """Delete the given rows; return the ids this call actually removed (a
+    concurrent generate may have claimed some of them first)."""
+    claimed: List[int] = []
+    with connect() as conn:
+        for rid in ids:
+            if conn.execute("DELETE FROM quote_reservoir WHERE id = ?", (rid,)).rowcount:
+                claimed.append(rid)
+    return claimed
+
+
+def reservoir_counts() -> Dict[str, int]:
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT topic, COUNT(*) AS n FROM quote_reservoir GROUP BY topic"
+        ).fetchall()
+    return {r["topic"]: r["n"] for r in rows}
@@ -0,0 +1,145 @@
+"""In-process metrics with a Prometheus text endpoint (`GET /metrics`).
+
+Deliberately dependency-free: a tiny counter/histogram registry that renders
+the Prometheus text exposition format (0.0.4). Pipeline code wraps each stage
+in `span("stage.name")`, which records its latency into
+`pipeline_stage_seconds` and, if it raises, bumps `pipeline_stage_errors_total`.
+
+Stage names are a fixed, low-cardinality set (`hosting.sync`, `news.fetch`,
+`llm.generate_batch`, `scraper.scrape`, `render.slide`, `hosting.push`,
+`instagram.graph`, ...) — never put URLs or ids in a label.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for lv, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(self.labels, lv)} {v:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = _DEFAULT_BUCKETS) -> None:
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for lv, (counts, total, n) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, c in zip(self.buckets, counts):
+                    cumulative += c
+                    le = _fmt_labels(self.labels, lv, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _fmt_labels(self.labels, lv, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {n}")
+                lines.append(f"{self.name}_sum{_fmt_labels(self.labels, lv)} {total:.6f}")
+                lines.append(f"{self.name}_count{_fmt_labels(self.labels, lv)} {n}")
+        return lines
+
+
+# ===================== registry =====================
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "Latency of each pipeline stage.", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "pipeline_stage_errors_total", "Exceptions raised inside a pipeline stage.", ("stage",)
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM tokens billed, by kind (prompt/completion/cached).", ("kind",)
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")
+)
+BATCHES = Counter(
+    "batches_generated_total", "Batches generated, by niche.", ("niche",)
+)
+POSTS_PUBLISHED = Counter(
+    "posts_published_total", "Posts published to Instagram, by niche.", ("niche",)
+)
+# Which stage of the staged text/watermark detector decided each candidate.
+# passed{stage="regions"} is OCR that never ran; multiply by the mean of
+# pipeline_stage_seconds{stage="scraper.ocr"} for the time saved.
+WATERMARK_CHECKS = Counter(
+    "scraper_watermark_checks_total",
+    "Background text/watermark checks by deciding stage and result.", ("stage", "result"),
+)
+
+_REGISTRY = (STAGE_SECONDS, STAGE_ERRORS, LLM_TOKENS, CACHE_REQUESTS, BATCHES, POSTS_PUBLISHED,
+             WATERMARK_CHECKS)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage; count it as an error if it raises."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage)
+
+
+def cache(name: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(name, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,91 @@
+"""Opt-in, request-scoped sampling profiler.
+
+`POST /api/generate?profile=1` (or header `X-Profile: 1`) runs that single
+request under a `SamplingProfiler`. A background thread snapshots every
+thread's Python stack (`sys._current_frames()`) every `PROFILE_INTERVAL_MS`
+and counts identical stacks. The result is written in the collapsed/"folded"
+format (`frame;frame;frame count` per line) next to the batch id, which
+flamegraph.pl, speedscope and inferno all read directly.
+
+Sampling (instead of cProfile) is what makes this useful here: most of a
+generate runs in worker threads (Playwright, OCR, Pillow via
+`asyncio.to_thread`), which a per-thread tracer never sees. Only stacks that
+pass through this app's code are kept, so idle pool/event-loop threads drop
+out; a concurrent request would show up in the same trace. Disabled, it costs
+nothing — no thread, no hooks.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from app import settings
+
+_APP_DIR = str(Path(__file__).resolve().parent)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_APP_DIR):
+        path = "app" + path[len(_APP_DIR):].replace("\\", "/")
+    else:
+        path = Path(path).name
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.is_set():
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack, in_app = [], False
+                while frame is not None:
+                    in_app = in_app or frame.f_code.co_filename.startswith(_APP_DIR)
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not in_app:
+                    continue
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(f"thread:{names.get(tid, tid)}")
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def save(self, name: str) -> Path:
+        settings.PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        path = settings.PROFILES_DIR / f"{name}.folded"
+        path.write_text(self.folded(), encoding="utf-8")
+        return path
+
+
+def profile_path(name: str) -> Optional[Path]:
+    path = settings.PROFILES_DIR / f"{name}.folded"
+    return path if path.exists() else None
@@ -2,22 +2,100 @@
 
 Everything the UI Settings panel reads/writes goes through here:
   - Instagram accounts (label, niche, business id, access token, active)
-  - App settings (News API key, GitHub hosting overrides, batch sizes)
+  - App settings (News API key, hosting backend + GitHub overrides, batch sizes)
 
 The OpenAI key is intentionally NOT stored here — it lives in `.env`.
 
 Secrets are masked when listed for the frontend; full values are only ever
 read internally (e.g. by the Instagram publisher).
+
+Reads are served from an in-process cache: all of `app_settings` and all
+account rows are loaded with one query each and kept until a write through
+this module (`set_setting`, `add_account`, `update_account`,
+`delete_account`) bumps the cache version. Decrypted tokens are cached for
+`SECRET_CACHE_TTL` seconds only. Writes made by another process are not seen
+until `invalidate()` — the app runs as a single uvicorn process.
 """
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-from app import crypto, settings
+from app import crypto, metrics, settings
 from app.db import connect, init_db
 
 VALID_NICHES = ("quotes", "news", "both")
+SECRET_CACHE_TTL = 300.0
+
+_cache_lock = threading.RLock()
+_version = 0
+_settings_cache: Optional[Dict[str, Optional[str]]] = None
+_accounts_cache: Optional[List[Dict[str, Any]]] = None     # raw rows, tokens encrypted
+_public_cache: Optional[List[Dict[str, Any]]] = None       # masked, frontend-safe
+_secrets: Dict[str, Tuple[float, str]] = {}                 # ciphertext -> (expires, plaintext)
+
+
+# ===================== CACHE =====================
+
+def invalidate() -> None:
+    """Drop every cached read; the next access reloads from the DB."""
+    global _version, _settings_cache, _accounts_cache, _public_cache
+    with _cache_lock:
+        _version += 1
+        _settings_cache = _accounts_cache = _public_cache = None
+        _secrets.clear()
+
+
+def cache_version() -> int:
+    """Bumped on every write; lets dependants (e.g. handle caches) revalidate."""
+    return _version
+
+
+def _decrypt(stored: Optional[str]) -> str:
+    """crypto.decrypt with a short-lived plaintext cache."""
+    if not stored:
+        return ""
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _secrets.get(stored)
+        if hit and hit[0] > now:
+            return hit[1]
+    plain = crypto.decrypt(stored)
+    with _cache_lock:
+        _secrets[stored] = (now + SECRET_CACHE_TTL, plain)
+    return plain
+
+
+def _account_rows() -> List[Dict[str, Any]]:
+    global _accounts_cache
+    with _cache_lock:
+        metrics.cache("accounts", _accounts_cache is not None)
+        if _accounts_cache is None:
+            with connect() as conn:
+                rows = conn.execute("SELECT * FROM accounts ORDER BY id").fetchall()
+            _accounts_cache = [dict(r) for r in rows]
+        return _accounts_cache
+
+
+def _public_rows() -> List[Dict[str, Any]]:
+    global _public_cache
+    with _cache_lock:
+        if _public_cache is None:
+            _public_cache = [_account_public(r) for r in _account_rows()]
+        return _public_cache
+
+
+def _settings_map() -> Dict[str, Optional[str]]:
+    global _settings_cache
+    with _cache_lock:
+        metrics.cache("settings", _settings_cache is not None)
+        if _settings_cache is None:
+            with connect() as conn:
+                rows = conn.execute("SELECT key, value FROM app_settings").fetchall()
+            _settings_cache = {r["key"]: r["value"] for r in rows}
+        return _settings_cache
 
 
 # ===================== ACCOUNTS =====================
@@ -36,10 +114,10 @@ def _account_public(row: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": row["id"],
         "label": row["label"],
-        "handle": (row["handle"] if "handle" in row.keys() else "") or "",
+        "handle": row.get("handle") or "",
         "niche": row["niche"],
         "ig_business_id": row["ig_business_id"] or "",
-        "ig_access_token_masked": _mask(crypto.decrypt(row["ig_access_token"])),
+        "ig_access_token_masked": _mask(_decrypt(row["ig_access_token"])),
         "has_token": bool(row["ig_access_token"]),
         "is_active": bool(row["is_active"]),
         "created_at": row["created_at"],
@@ -47,32 +125,24 @@ def _account_public(row: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def list_accounts(niche: Optional[str] = None, active_only: bool = False) -> List[Dict[str, Any]]:
-    with connect() as conn:
-        cur = conn.cursor()
-        clauses, params = [], []
-        if niche:
-            # 'both' accounts match any niche filter
-            clauses.append("(niche = ? OR niche = 'both')")
-            params.append(niche)
-        if active_only:
-            clauses.append("is_active = 1")
-        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
-        cur.execute(f"SELECT * FROM accounts{where} ORDER BY id", params)
-        return [_account_public(dict(r)) for r in cur.fetchall()]
+    return [
+        dict(a) for a in _public_rows()
+        # 'both' accounts match any niche filter
+        if (not niche or a["niche"] in (niche, "both"))
+        and (not active_only or a["is_active"])
+    ]
 
 
 def get_account(account_id: int, *, with_secret: bool = False) -> Optional[Dict[str, Any]]:
-    with connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
-        row = cur.fetchone()
-    if not row:
-        return None
     if with_secret:
+        row = next((r for r in _account_rows() if r["id"] == account_id), None)
+        if not row:
+            return None
         d = dict(row)
-        d["ig_access_token"] = crypto.decrypt(d["ig_access_token"])  # plaintext for the publisher
+        d["ig_access_token"] = _decrypt(d["ig_access_token"])  # plaintext for the publisher
         return d
-    return _account_public(dict(row))
+    pub = next((a for a in _public_rows() if a["id"] == account_id), None)
+    return dict(pub) if pub else None
 
 
 def _clean_handle(handle: str) -> str:
@@ -94,6 +164,7 @@ def add_account(
              crypto.encrypt(ig_access_token.strip()), int(is_active)),
         )
         new_id = int(cur.lastrowid)
+    invalidate()
     return get_account(new_id)  # type: ignore[return-value]
 
 
@@ -122,6 +193,7 @@ def update_account(account_id: int, **fields: Any) -> Optional[Dict[str, Any]]:
     params.append(account_id)
     with connect() as conn:
         conn.execute(f"UPDATE accounts SET {', '.join(sets)} WHERE id = ?", params)
+    invalidate()
     return get_account(account_id)
 
 
@@ -144,7 +216,9 @@ def delete_account(account_id: int) -> bool:
     with connect() as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
-        return cur.rowcount > 0
+        deleted = cur.rowcount > 0
+    invalidate()
+    return deleted
 
 
 # ===================== APP SETTINGS =====================
@@ -154,6 +228,7 @@ _SECRET_SETTINGS = {"news_api_key", "github_token"}
 
 _DEFAULT_SETTINGS = {
     "news_api_key": "",
+    "hosting_backend": settings.HOSTING_BACKEND,
     "github_username": settings.GITHUB_USERNAME,
     "github_repo": settings.GITHUB_REPO,
     "github_branch": settings.GITHUB_BRANCH,
@@ -162,16 +237,17 @@ _DEFAULT_SETTINGS = {
     # Brand hashtags appended to every caption (space/comma separated).
     # Overrides config.json hashtags.fixed when non-empty.
     "fixed_hashtags": "",
+    # Topics the background news ingester polls (comma separated).
+    "news_topics": "",
+    # Extra RSS feed URLs aggregated alongside Google News / News API.
+    "news_feeds": "",
 }
 
 
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
-    with connect() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT value FROM app_settings WHERE key = ?", (key,))
-        row = cur.fetchone()
-    if row is not None:
-        return row["value"]
+    stored = _settings_map()
+    if key in stored:
+        return stored[key]
     return default if default is not None else _DEFAULT_SETTINGS.get(key)
 
 
@@ -187,6 +263,7 @@ def set_setting(key: str, value: str) -> None:
                                               updated_at = datetime('now')""",
             (key, value),
         )
+    invalidate()
 
 
 def get_public_settings() -> Dict[str, Any]:
@@ -223,6 +300,7 @@ def encrypt_legacy_tokens() -> None:
                     "UPDATE accounts SET ig_access_token = ? WHERE id = ?",
                     (crypto.encrypt(tok), row["id"]),
                 )
+    invalidate()
 
 
 def seed_from_env() -> None:
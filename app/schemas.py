@@ -5,6 +5,8 @@ from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
+from app.settings import MAX_POSTS_PER_BATCH, MAX_SLIDES_PER_POST
+
 
 # ---- Accounts (rags) -----------------------------------------------------
 class AccountIn(BaseModel):
@@ -28,19 +30,22 @@ class AccountUpdate(BaseModel):
 # ---- Settings (rags) -----------------------------------------------------
 class SettingsIn(BaseModel):
     news_api_key: Optional[str] = None
+    hosting_backend: Optional[str] = Field(None, pattern="^(git|git-media|s3|local)$")
     github_username: Optional[str] = None
     github_repo: Optional[str] = None
     github_branch: Optional[str] = None
-    posts_per_batch: Optional[int] = Field(None, ge=1, le=6)
-    slides_per_post: Optional[int] = Field(None, ge=1, le=6)
+    posts_per_batch: Optional[int] = Field(None, ge=1, le=MAX_POSTS_PER_BATCH)
+    slides_per_post: Optional[int] = Field(None, ge=1, le=MAX_SLIDES_PER_POST)
     fixed_hashtags: Optional[str] = None
+    news_topics: Optional[str] = None
+    news_feeds: Optional[str] = None
 
 
 # ---- Generation ----------------------------------------------------------
 class GenerateRequest(BaseModel):
     niche: str = "quotes"                      # quotes | news
-    posts: Optional[int] = Field(None, ge=1, le=6)
-    slides: Optional[int] = Field(None, ge=1, le=6)
+    posts: Optional[int] = Field(None, ge=1, le=MAX_POSTS_PER_BATCH)
+    slides: Optional[int] = Field(None, ge=1, le=MAX_SLIDES_PER_POST)
     topic: Optional[str] = None                # quotes theme or news topic
 
 
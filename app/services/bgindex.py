@@ -0,0 +1,176 @@
+"""Index of recently used backgrounds, so an image is not reused across posts.
+
+Pinterest serves one pin under many size paths (`/236x/`, `/736x/`,
+`/originals/`) and re-uploads of the same photo under different pins. Two keys
+catch both:
+
+  - `url_key`: the URL without its size segment/extension (exact re-serves,
+    checked before download),
+  - `dhash`:   a 64-bit difference hash of the decoded image (visual
+    duplicates, checked right after the analysis decode, before scoring).
+
+Every background `render_post_slides` draws is recorded in SQLite
+(`used_backgrounds`). In process the last BG_REUSE_DAYS are held as a URL-key
+set plus a multi-index hash table, so "anything within N bits?" compares
+against a small part of the index instead of every entry.
+
+Speculative (pre-warmed) batches only `reserve` their backgrounds: held in
+memory so no other batch picks them, written to SQLite by `record` once the
+batch is actually handed to a user, or dropped by `release` if it is
+discarded, so thrown-away renders do not drain the pool.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from app import db, settings
+
+_PINIMG_RE = re.compile(r"^https?://i\.pinimg\.com/[^/]+/(.+?)(?:\.\w+)?$")
+
+
+def url_key(url: str) -> str:
+    """Size-independent identity of an image URL."""
+    m = _PINIMG_RE.match(url)
+    if m:
+        return f"pinimg:{m.group(1)}"
+    return url.split("?", 1)[0].split("#", 1)[0]
+
+
+def dhash(pixels: np.ndarray) -> int:
+    """64-bit difference hash of a uint8 gray or RGB array (any size)."""
+    gray = pixels if pixels.ndim == 2 else cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class HashIndex:
+    """Multi-index hashing over 64-bit hashes (Hamming distance).
+
+    Each hash is filed under its 8 bytes. Two hashes within r <= 7 bits must
+    agree exactly on at least one byte (pigeonhole), so a query only compares
+    against the entries sharing a byte with it — about 8/256 of the index —
+    instead of all of them. Larger radii fall back to a linear scan.
+    """
+
+    _CHUNKS = 8
+
+    def __init__(self, items: Iterable[int] = ()) -> None:
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(self._CHUNKS)]
+        self._all: Set[int] = set()
+        for h in items:
+            self.add(h)
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def add(self, h: int) -> None:
+        if h in self._all:
+            return
+        self._all.add(h)
+        for i, table in enumerate(self._tables):
+            table.setdefault((h >> (8 * i)) & 0xFF, []).append(h)
+
+    def find(self, h: int, radius: int) -> Optional[int]:
+        """Any stored hash within `radius` bits of `h`, else None."""
+        if radius < 0:
+            return None
+        if h in self._all:
+            return h
+        if radius >= self._CHUNKS:
+            candidates: Iterable[int] = self._all
+        else:
+            candidates = (c for i, table in enumerate(self._tables)
+                          for c in table.get((h >> (8 * i)) & 0xFF, ()))
+        for c in candidates:
+            if hamming(h, c) <= radius:
+                return c
+        return None
+
+
+_lock = threading.Lock()
+_keys: Optional[Set[str]] = None
+_hashes: Optional[HashIndex] = None
+_loaded_at = 0.0
+_reserved: Dict[str, List[Tuple[str, int]]] = {}  # batch id -> (url_key, dhash)
+_RELOAD_EVERY = 3600.0  # also drops entries that aged out of the window
+
+
+def _window_start() -> float:
+    return time.time() - settings.BG_REUSE_DAYS * 86400
+
+
+def _ensure_loaded() -> None:
+    global _keys, _hashes, _loaded_at
+    if _hashes is not None and time.monotonic() - _loaded_at < _RELOAD_EVERY:
+        return
+    try:
+        db.prune_backgrounds(_window_start())
+        rows = db.recent_backgrounds(_window_start())
+    except Exception as exc:
+        print(f"[bgindex] could not load used backgrounds: {exc}")
+        rows = []
+    _keys = {key for key, _ in rows if key}
+    _hashes = HashIndex(h for _, h in rows)
+    _loaded_at = time.monotonic()
+
+
+def is_used_url(url: str) -> bool:
+    key = url_key(url)
+    with _lock:
+        _ensure_loaded()
+        return key in _keys or any(key == k for rows in _reserved.values() for k, _ in rows)
+
+
+def is_used_image(h: int) -> bool:
+    radius = settings.BG_HASH_DISTANCE
+    with _lock:
+        _ensure_loaded()
+        if _hashes.find(h, radius) is not None:
+            return True
+        # a handful of entries (warm batches x slides): a linear scan is fine
+        return radius >= 0 and any(hamming(h, r) <= radius
+                                   for rows in _reserved.values() for _, r in rows)
+
+
+def record(entries: List[Tuple[str, int]]) -> None:
+    """Mark (url, dhash) backgrounds as used: SQLite + the in-process index."""
+    if not entries:
+        return
+    rows = [(url_key(url), h) for url, h in entries]
+    try:
+        db.add_used_backgrounds(rows, time.time())
+    except Exception as exc:
+        print(f"[bgindex] could not record backgrounds: {exc}")
+    with _lock:
+        _ensure_loaded()
+        for key, h in rows:
+            _keys.add(key)
+            _hashes.add(h)
+
+
+def reserve(batch_id: str, entries: List[Tuple[str, int]]) -> None:
+    """Hold (url, dhash) backgrounds for a speculative batch, memory only."""
+    with _lock:
+        _reserved[batch_id] = [(url_key(url), h) for url, h in entries]
+
+
+def release(batch_id: str) -> None:
+    with _lock:
+        _reserved.pop(batch_id, None)
+
+
+def invalidate() -> None:
+    global _hashes
+    with _lock:
+        _hashes = None
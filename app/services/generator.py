@@ -1,25 +1,48 @@
 """Orchestration: niche -> batch of carousel previews -> publish.
 
-Generation makes exactly ONE LLM call for the whole batch, renders slides
-locally and serves them as previews (no git push yet). Publishing a chosen
-post pushes only that post's slides to GitHub and posts the carousel to the
+Generation makes ONE LLM call per shard of the batch — a single call unless
+the batch is larger than one call's output budget (quotes are served from the
+pre-generated reservoir when it has stock), renders slides locally and serves
+them as previews (no git push yet). A request matching a
+pre-rendered warm batch is answered with that batch instead. Publishing a chosen
+post hands only that post's slides to the hosting backend and posts the carousel to the
 selected account.
 """
 from __future__ import annotations
 
+import asyncio
+import itertools
 import re
+import time
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from app import db, rags, settings
+from app import db, metrics, rags, settings
 from app.appconfig import load_config
-from app.services import hosting, instagram, llm, news, render, scraper
+from app.services import (
+    bgindex, handles, hosting, ingest, instagram, llm, prewarm, render, reservoir,
+    retention, scraper,
+)
 
-# In-memory store of pending (un-published) batches.
+# In-memory store of pending (un-published) batches. Entries are dropped by
+# the preview retention sweep together with their files (services/retention.py).
 _BATCHES: Dict[str, Dict[str, Any]] = {}
 
 
+def drop_batch(batch_id: str) -> None:
+    _BATCHES.pop(batch_id, None)
+    prewarm.discard(batch_id)
+
+
+def expire_batches(before_ts: float) -> int:
+    """Forget pending batches created before `before_ts`."""
+    stale = [bid for bid, b in list(_BATCHES.items()) if b.get("created_ts", 0) < before_ts]
+    for bid in stale:
+        _BATCHES.pop(bid, None)
+    return len(stale)
+
+
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -31,36 +54,6 @@ def _fixed_hashtags() -> List[str]:
     return [t for t in items if t]
 
 
-def _overlay_handle(niche: str) -> Optional[str]:
-    """Resolve the @handle to overlay on a niche's slides.
-
-    Order: a handle already stored on the niche's account → otherwise fetch the
-    real IG @username from the Graph API once and cache it onto the account →
-    otherwise the account label. Falls back to None (config default) if there
-    is no account for the niche at all.
-    """
-    accounts = rags.list_accounts(niche=niche, active_only=True) or rags.list_accounts(niche=niche)
-    if not accounts:
-        return None
-    acct = accounts[0]
-    if acct.get("handle"):
-        return acct["handle"]
-
-    # No handle yet — discover the genuine username from Instagram and store it,
-    # so future generations reuse it and the UI shows it (one API call, cached).
-    full = rags.get_account(acct["id"], with_secret=True)
-    if full:
-        try:
-            username = instagram.fetch_username(full)
-        except Exception as exc:
-            username = None
-            print(f"[generator] IG username lookup failed: {exc}")
-        if username:
-            rags.update_account(acct["id"], handle=username)
-            return username
-    return acct.get("label") or None
-
-
 def _compose_caption(post: Dict[str, Any], niche: str, fixed_tags: List[str]) -> str:
     """Final caption: lead quote (quotes only) + body + LLM hashtags + fixed hashtags."""
     tags, seen = [], set()
@@ -90,11 +83,36 @@ def _public_post(post: Dict[str, Any]) -> Dict[str, Any]:
         "slides": post["slides"],
         "source": post["source"],
         "preview_urls": post["preview_urls"],
+        "full_urls": post["full_urls"],
         "published": post["published"],
         "result": post["result"],
     }
 
 
+def _encoding_report(stats: Dict[str, int]) -> Dict[str, Any]:
+    """Per-batch slide byte totals, savings of the byte-budget search over the
+    optimized `max_quality` encode, and the JPEG qualities that fit the budget.
+    (The Huffman/progressive gain over a plain quality-92 encode is measured
+    by bench/render, not on the render path.)"""
+    slides, total = stats.get("slides", 0), stats.get("bytes", 0)
+    baseline = stats.get("baseline_bytes", 0)
+    saved = baseline - total
+    report = {
+        "slides": slides,
+        "bytes": total,
+        "baseline_bytes": baseline,
+        "saved_bytes": saved,
+        "saved_pct": round(100.0 * saved / baseline, 1) if baseline else 0.0,
+        "mean_quality": round(stats.get("quality", 0) / slides, 1) if slides else 0.0,
+        "over_budget": stats.get("over_budget", 0),
+    }
+    if slides:
+        print(f"[generator] encoded {slides} slides: {total // 1024} KB "
+              f"(saved {saved // 1024} KB, {report['saved_pct']}%; mean quality "
+              f"{report['mean_quality']}, {report['over_budget']} over budget)")
+    return report
+
+
 def public_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "batch_id": batch["id"],
@@ -102,28 +120,103 @@ def public_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
         "created_at": batch["created_at"],
         "model": batch["model"],
         "usage": batch["usage"],
+        "encoding": batch.get("encoding"),
+        "prewarmed": batch.get("prewarmed", False),
         "posts": [_public_post(p) for p in batch["posts"]],
     }
 
 
+def _sum_usage(parts: List[Dict[str, Any]], reservoir_posts: int) -> Dict[str, Any]:
+    """Token usage of all shard calls of a batch, in generate_batch's shape."""
+    prompt = sum(p.get("prompt_tokens") or 0 for p in parts)
+    completion = sum(p.get("completion_tokens") or 0 for p in parts)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": sum(p.get("total_tokens") or 0 for p in parts),
+        "cached_tokens": sum(p.get("cached_tokens") or 0 for p in parts),
+        "io_ratio": round(prompt / completion, 2) if completion else 0,
+        "calls": len(parts),
+        "reservoir_posts": reservoir_posts,
+    }
+
+
+async def _backgrounds(post: Dict[str, Any], slides: int, claimed: set) -> List[str]:
+    """Distinct background URLs for one post, none already claimed by another
+    post of the same batch (posts are scraped concurrently)."""
+    # Both niches get scraped backgrounds (quotes: aesthetic photo;
+    # news: a moody backdrop for the infographic, with a heavy dark overlay).
+    background_urls: List[str] = []
+    query = (post.get("image_query") or post.get("theme")
+             or post.get("title") or "aesthetic minimal background")
+    try:
+        scraped = await scraper.scrape_backgrounds(
+            f"{query} aesthetic background", limit=max(slides + 2, 6)
+        )
+        background_urls = [s["url"] for s in scraped if bgindex.url_key(s["url"]) not in claimed]
+        # Top up with a broad query so every slide gets a DISTINCT background
+        # (otherwise a narrow query repeats one image or falls back to gradient).
+        if len(background_urls) < slides:
+            for fb in ("minimal aesthetic gradient wallpaper",
+                       "calm nature aesthetic background"):
+                if len(background_urls) >= slides:
+                    break
+                extra = await scraper.scrape_backgrounds(fb, limit=slides * 2)
+                have = claimed | {bgindex.url_key(u) for u in background_urls}
+                for s in extra:
+                    if bgindex.url_key(s["url"]) not in have:
+                        have.add(bgindex.url_key(s["url"]))
+                        background_urls.append(s["url"])
+                    if len(background_urls) >= slides:
+                        break
+    except Exception as exc:
+        print(f"[generator] background scrape failed for {post.get('title')!r}: {exc}")
+    # re-check after the last await: a concurrent post may have claimed some
+    background_urls = [u for u in background_urls if bgindex.url_key(u) not in claimed][:slides]
+    claimed.update(bgindex.url_key(u) for u in background_urls)
+    return background_urls
+
+
+def resolve_params(niche: str, posts: Optional[int], slides: Optional[int]) -> Tuple[str, int, int]:
+    """(niche, posts, slides) with unknown niches and missing counts defaulted."""
+    niche = niche if niche in settings.NICHES else "quotes"
+    posts = posts or rags.get_int_setting("posts_per_batch", settings.DEFAULT_POSTS_PER_BATCH, 1, settings.MAX_POSTS_PER_BATCH)
+    slides = slides or rags.get_int_setting("slides_per_post", settings.DEFAULT_SLIDES_PER_POST, 1, settings.MAX_SLIDES_PER_POST)
+    return niche, posts, slides
+
+
 async def generate(
     *, niche: str, posts: Optional[int] = None, slides: Optional[int] = None,
     topic: Optional[str] = None,
 ) -> Dict[str, Any]:
-    niche = niche if niche in settings.NICHES else "quotes"
-    posts = posts or rags.get_int_setting("posts_per_batch", settings.DEFAULT_POSTS_PER_BATCH, 1, settings.MAX_POSTS_PER_BATCH)
-    slides = slides or rags.get_int_setting("slides_per_post", settings.DEFAULT_SLIDES_PER_POST, 1, settings.MAX_SLIDES_PER_POST)
+    niche, posts, slides = resolve_params(niche, posts, slides)
+    with metrics.span("generate"):
+        # A matching pre-rendered batch (services/prewarm.py) is returned as is.
+        batch = prewarm.claim(niche, posts, slides, topic)
+        if batch is None:
+            with prewarm.interactive():
+                batch = await build_batch(niche=niche, posts=posts, slides=slides, topic=topic)
+        _BATCHES[batch["id"]] = batch
+    metrics.BATCHES.inc(batch["niche"])
+    return public_batch(batch)
 
-    # Multi-machine: catch up on what another laptop published before we start,
-    # so the eventual publish-push has little/nothing to reconcile. Best-effort.
-    try:
-        hosting.sync()
-    except Exception as exc:
-        print(f"[generator] repo sync skipped: {exc}")
+
+async def build_batch(
+    *, niche: str, posts: int, slides: int, topic: Optional[str], speculative: bool = False,
+) -> Dict[str, Any]:
+    """Generate and render one batch; files are tracked for retention, but
+    the batch is not yet pending (generate / the pre-warmer register it).
+
+    `speculative` (pre-warmer): no reservoir refill is started (the lifespan
+    loop tops stock up), and backgrounds are only reserved in the reuse index
+    — recorded when the batch is claimed, released if it is discarded."""
+    # No repo sync here: multi-machine catch-up runs in the background
+    # (hosting.sync_forever), so generation never waits on git/network.
 
     news_items: List[Dict[str, str]] = []
     if niche == "news":
-        news_items = news.fetch_news(topic=topic, limit=max(posts * 2, posts))
+        # Fresh, unposted stories from the local store (background-ingested).
+        news_items = ingest.pick_fresh(topic, limit=max(posts * 2, posts))
         if not news_items:
             raise RuntimeError("No news could be fetched. Try a different topic.")
 
@@ -135,96 +228,186 @@ async def generate(
         avoid_quotes = db.get_recent_quote_texts(limit=history_depth)
         used_norms = db.get_used_quote_norms()
 
-    # ---- the single LLM call ----
-    result = llm.generate_batch(
-        niche=niche, posts=posts, slides=slides, topic=topic,
-        news_items=news_items, avoid_quotes=avoid_quotes,
-    )
+    # quotes: serve pre-generated posts first (services/reservoir.py), then
+    # kick off a background refill if the topic's stock ran low.
+    stocked: List[Dict[str, Any]] = []
+    stocked_model = None
+    if niche == "quotes" and reservoir.enabled():
+        stocked, stocked_model = reservoir.take(topic, posts, slides, used_norms)
+        if not speculative:
+            reservoir.ensure(topic)
 
     batch_id = uuid.uuid4().hex
     out_dir = settings.PREVIEWS_DIR
     fixed_tags = _fixed_hashtags()
     # Overlay handle reflects the account that owns this niche (news page vs
     # quotes page): a stored handle, else the real IG username auto-fetched
-    # from the Graph API and cached, else the label.
-    overlay_handle = _overlay_handle(niche)
-    seen_in_batch: set = set()
-
-    built_posts: List[Dict[str, Any]] = []
-    for i, post in enumerate(result["posts"]):
-        # hard de-dup guard: drop slide quotes already used (history or this batch)
-        if niche == "quotes":
-            kept = []
-            for s in post["slides"]:
-                norm = db.normalize_quote(s.get("body", ""))
-                if not norm or norm in used_norms or norm in seen_in_batch:
-                    continue
-                seen_in_batch.add(norm)
-                kept.append(s)
-            if kept:  # keep originals only if everything was a duplicate (rare)
-                post["slides"] = kept
-
-        # Both niches now get scraped backgrounds (quotes: aesthetic photo;
-        # news: a moody backdrop for the infographic, with a heavy dark overlay).
-        background_urls: List[str] = []
-        query = (post.get("image_query") or post.get("theme")
-                 or post.get("title") or "aesthetic minimal background")
-        try:
-            scraped = await scraper.scrape_backgrounds(
-                f"{query} aesthetic background", limit=max(slides + 2, 6)
+    # from the Graph API and cached, else the label. Memoized per niche.
+    overlay_handle = handles.resolve(niche)
+
+    # ---- shards: one LLM call per shard, only for what the reservoir did not cover ----
+    # Calls run concurrently (LLM_CONCURRENCY); each shard's posts go on to
+    # scrape + render (RENDER_CONCURRENCY) as soon as its call returns.
+    # Merge state below is only touched from this event loop, between awaits.
+    per_call = llm.shard_posts(slides)
+    seen_quotes: set = set()
+    themes: Dict[str, int] = {}  # normalized theme -> shard that used it
+    used_stories: set = set()
+    claimed_bgs: set = set()
+    encoding: Dict[str, int] = {}
+    usages: List[Dict[str, Any]] = []
+    models: List[str] = []
+    built: List[Dict[str, Any]] = []
+    drawn: List[Tuple[str, int]] = []  # speculative only: backgrounds to reserve
+    dropped = 0
+    palette = itertools.count()  # colour cycling follows merge order
+    llm_slots = asyncio.Semaphore(max(1, settings.LLM_CONCURRENCY))
+    render_slots = asyncio.Semaphore(max(1, settings.RENDER_CONCURRENCY))
+
+    def merge(shard: int, raw_posts: List[Dict[str, Any]], items: List[Dict[str, str]]):
+        """Cross-shard de-dup: quotes (history + batch), themes, news stories."""
+        nonlocal dropped
+        out = []
+        for post in raw_posts:
+            theme = db.normalize_quote(post.get("theme", ""))
+            if theme and themes.get(theme, shard) != shard:
+                dropped += 1
+                continue
+            item = post.get("item")
+            story = items[item] if item is not None and 0 <= item < len(items) else None
+            if story and story["link"] in used_stories:
+                dropped += 1
+                continue
+            if niche == "quotes":
+                kept = []
+                for sl in post["slides"]:
+                    norm = db.normalize_quote(sl.get("body", ""))
+                    if not norm or norm in used_norms or norm in seen_quotes:
+                        continue
+                    seen_quotes.add(norm)
+                    kept.append(sl)
+                if kept:  # keep originals only if everything was a duplicate (rare)
+                    post["slides"] = kept
+            if theme:
+                themes[theme] = shard
+            if story:
+                used_stories.add(story["link"])
+            out.append((post, story, next(palette)))
+        return out
+
+    async def build_post(shard: int, pos: int, post: Dict[str, Any], story, palette_idx: int):
+        async with render_slots:
+            background_urls = await _backgrounds(post, slides, claimed_bgs)
+            stats: Dict[str, int] = {}
+            preview_paths: List[str] = []
+            drawn_here: List[Tuple[str, int]] = []
+            slide_paths = await asyncio.to_thread(
+                render.render_post_slides,
+                post=post, niche=niche, out_dir=out_dir, post_id=f"{batch_id[:8]}_{shard}_{pos}",
+                background_urls=background_urls, handle=overlay_handle, palette_idx=palette_idx,
+                stats=stats, previews=preview_paths,
+                backgrounds=drawn_here if speculative else None,
             )
-            background_urls = [s["url"] for s in scraped]
-            # Top up with a broad query so every slide gets a DISTINCT background
-            # (otherwise a narrow query repeats one image or falls back to gradient).
-            if len(background_urls) < slides:
-                for fb in ("minimal aesthetic gradient wallpaper",
-                           "calm nature aesthetic background"):
-                    if len(background_urls) >= slides:
-                        break
-                    extra = await scraper.scrape_backgrounds(fb, limit=slides * 2)
-                    for s in extra:
-                        if s["url"] not in background_urls:
-                            background_urls.append(s["url"])
-                        if len(background_urls) >= slides:
-                            break
-        except Exception as exc:
-            print(f"[generator] background scrape failed for post {i}: {exc}")
-
-        slide_paths = render.render_post_slides(
-            post=post, niche=niche, out_dir=out_dir, post_id=f"{batch_id[:8]}_{i}",
-            background_urls=background_urls, handle=overlay_handle, palette_idx=i,
-        )
-        caption_full = _compose_caption(post, niche, fixed_tags)
-
-        built_posts.append(
+        if speculative:
+            drawn.extend(drawn_here)
+            bgindex.reserve(batch_id, drawn)
+        for key, value in stats.items():
+            encoding[key] = encoding.get(key, 0) + value
+        built.append(
             {
-                "index": i,
+                "_order": (shard, pos),
                 "title": post["title"],
                 "caption": post["caption"],
-                "caption_full": caption_full,
+                "caption_full": _compose_caption(post, niche, fixed_tags),
                 "hashtags": post["hashtags"],
                 "slides": post["slides"],
                 "source": post.get("source", ""),
+                "story_link": story["link"] if story else None,
                 "slide_paths": slide_paths,
-                "preview_urls": [hosting.preview_url(p) for p in slide_paths],
+                "preview_paths": preview_paths,
+                "preview_urls": [hosting.preview_url(p) for p in preview_paths],
+                "full_urls": [hosting.preview_url(p) for p in slide_paths],
                 "published": False,
                 "result": None,
             }
         )
 
+    async def build_all(shard: int, raw_posts: List[Dict[str, Any]], items: List[Dict[str, str]]):
+        await asyncio.gather(*(build_post(shard, pos, post, story, palette_idx)
+                               for pos, (post, story, palette_idx)
+                               in enumerate(merge(shard, raw_posts, items))))
+
+    async def run_shard(shard: int, count: int, items: List[Dict[str, str]], avoid: List[str]):
+        async with llm_slots:
+            result = await asyncio.to_thread(
+                llm.generate_batch, niche=niche, posts=count, slides=slides, topic=topic,
+                news_items=items, avoid_quotes=avoid,
+            )
+        usages.append(result["usage"])
+        models.append(result["model"])
+        await build_all(shard, result["posts"], items)
+
+    missing = posts - len(stocked)
+    jobs = [build_all(0, stocked, [])] if stocked else []
+    offset = shards = 0
+    for start in range(0, missing, per_call):
+        shards += 1
+        count = min(per_call, missing - start)
+        items = news_items[offset:offset + 2 * count]
+        offset += 2 * count
+        if niche == "news" and len(items) < count:
+            items = news_items  # too few stories to split: de-dup at merge instead
+        jobs.append(run_shard(shards, count, items, avoid_quotes))
+    errors = [r for r in await asyncio.gather(*jobs, return_exceptions=True)
+              if isinstance(r, BaseException)]
+
+    # Posts dropped as cross-shard duplicates: one top-up call, told about
+    # everything the batch already holds.
+    shortfall = posts - len(built)
+    fresh_items = [it for it in news_items if it["link"] not in used_stories]
+    if shortfall > 0 and dropped and not errors and (niche != "news" or fresh_items):
+        held = [sl["body"] for p in built for sl in p["slides"]] if niche == "quotes" else []
+        try:
+            await run_shard(shards + 1, min(shortfall, per_call), fresh_items,
+                            avoid_quotes + held[-settings.LLM_SHARD_SLIDES:])
+        except Exception as exc:  # noqa: BLE001 — a short batch beats no batch
+            print(f"[generator] top-up call failed: {exc}")
+    if errors:
+        if not built:
+            if speculative:
+                bgindex.release(batch_id)
+            raise errors[0]
+        print(f"[generator] {len(errors)} shard(s) failed, returning {len(built)} posts: {errors[0]}")
+
+    built.sort(key=lambda p: p["_order"])
+    for i, post in enumerate(built):
+        del post["_order"]
+        post["index"] = i
+
     batch = {
         "id": batch_id,
         "niche": niche,
         "created_at": _now(),
-        "model": result["model"],
-        "usage": result["usage"],
-        "posts": built_posts,
+        "created_ts": time.time(),
+        "model": models[0] if models else (stocked_model or settings.OPENAI_MODEL),
+        "usage": _sum_usage(usages, reservoir_posts=len(stocked)),
+        "encoding": _encoding_report(encoding),
+        "posts": built,
+        "backgrounds": drawn,
     }
-    _BATCHES[batch_id] = batch
-    return public_batch(batch)
+    retention.track(batch_id, [p for post in built
+                               for p in post["slide_paths"] + post["preview_paths"]])
+    return batch
 
 
 def publish(*, batch_id: str, post_index: int, account_id: int) -> Dict[str, Any]:
+    with metrics.span("publish"):
+        result = _publish(batch_id=batch_id, post_index=post_index, account_id=account_id)
+    metrics.POSTS_PUBLISHED.inc(_BATCHES[batch_id]["niche"])
+    return result
+
+
+def _publish(*, batch_id: str, post_index: int, account_id: int) -> Dict[str, Any]:
     batch = _BATCHES.get(batch_id)
     if not batch:
         raise RuntimeError("Batch not found or expired. Generate again.")
@@ -258,10 +441,13 @@ def publish(*, batch_id: str, post_index: int, account_id: int) -> Dict[str, Any
         slide_urls=raw_urls,
     )
 
-    # remember posted quotes so future generations don't repeat them
+    # remember posted quotes / stories so future generations don't repeat them
     if batch["niche"] == "quotes":
         db.add_used_quotes([s.get("body", "") for s in post["slides"]])
+    elif post.get("story_link"):
+        db.mark_articles_posted([post["story_link"]])
 
+    retention.pin(post["slide_paths"] + post["preview_paths"])
     post["published"] = True
     post["result"] = {
         "permalink": ig_result.get("permalink"),
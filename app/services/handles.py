@@ -0,0 +1,99 @@
+"""Overlay @handle resolution, memoized per niche.
+
+Order: a handle already stored on the niche's account -> otherwise fetch the
+real IG @username from the Graph API once and cache it onto the account ->
+otherwise the account label. None (config default) if the niche has no
+account at all.
+
+Resolved handles are cached per niche and keyed on the rags cache version, so
+any account add/update/delete invalidates them for free. A failed Graph
+lookup is remembered per account with exponential backoff (the label is used
+meanwhile), so a broken token no longer costs a network round trip on every
+generate. The backoff is tied to the same rags version: fixing the account's
+token (or any other rags change) clears it, and the next generate retries.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app import metrics, rags
+from app.services import instagram
+
+_BACKOFF_BASE = 60.0        # first retry after a failed lookup (seconds)
+_BACKOFF_MAX = 6 * 3600.0   # never wait longer than this between retries
+
+_lock = threading.Lock()
+# niche -> (rags cache version, handle, valid_until)
+_resolved: Dict[str, Tuple[int, Optional[str], float]] = {}
+# account id -> (retry_at, consecutive failures), valid for _failures_version
+_failures: Dict[int, Tuple[float, int]] = {}
+_failures_version = -1
+
+
+def _backoff(account_id: int) -> Tuple[float, int]:
+    """(retry_at, attempts) for the account; forgets every backoff once the
+    rags store changed since it was recorded. Caller holds _lock."""
+    global _failures_version
+    version = rags.cache_version()
+    if version != _failures_version:
+        _failures.clear()
+        _failures_version = version
+    return _failures.get(account_id, (0.0, 0))
+
+
+def _lookup(account_id: int) -> Optional[str]:
+    """Graph lookup honoring the negative cache. Stores the handle on success."""
+    now = time.monotonic()
+    with _lock:
+        retry_at, attempts = _backoff(account_id)
+    if now < retry_at:
+        return None
+    full = rags.get_account(account_id, with_secret=True)
+    username = None
+    if full:
+        try:
+            username = instagram.fetch_username(full)
+        except Exception as exc:
+            print(f"[handles] IG username lookup failed: {exc}")
+    if not username:
+        delay = min(_BACKOFF_MAX, _BACKOFF_BASE * (2 ** attempts))
+        with _lock:
+            _failures[account_id] = (now + delay, attempts + 1)
+        return None
+    with _lock:
+        _failures.pop(account_id, None)
+    rags.update_account(account_id, handle=username)  # bumps the rags version
+    return username
+
+
+def _resolve_uncached(niche: str) -> Tuple[Optional[str], float]:
+    accounts = rags.list_accounts(niche=niche, active_only=True) or rags.list_accounts(niche=niche)
+    if not accounts:
+        return None, float("inf")
+    acct = accounts[0]
+    if acct.get("handle"):
+        return acct["handle"], float("inf")
+    username = _lookup(acct["id"])
+    if username:
+        return username, float("inf")
+    # label fallback only until the backoff expires, then try Graph again
+    with _lock:
+        retry_at = _backoff(acct["id"])[0]
+    return acct.get("label") or None, retry_at
+
+
+def resolve(niche: str) -> Optional[str]:
+    """The @handle to overlay on `niche` slides (see module docstring)."""
+    version = rags.cache_version()
+    with _lock:
+        hit = _resolved.get(niche)
+    if hit and hit[0] == version and time.monotonic() < hit[2]:
+        metrics.cache("handles", True)
+        return hit[1]
+    metrics.cache("handles", False)
+    handle, valid_until = _resolve_uncached(niche)
+    with _lock:
+        _resolved[niche] = (rags.cache_version(), handle, valid_until)
+    return handle
@@ -1,34 +1,55 @@
-"""Public image hosting via GitHub raw.
+"""Public image hosting — pluggable backends.
 
-Instagram's Graph API can only ingest images from a public URL. We host the
-slide JPEGs by committing them to the configured PUBLIC repo and serving them
-through raw.githubusercontent.com.
+Instagram's Graph API can only ingest images from a public URL. Slides are
+rendered locally (served as previews by the `/cdn` mount) and only handed to a
+hosting backend at PUBLISH time. Four backends share one interface:
 
-Important: only the explicit image paths are staged (`git add <path>`), never
-the whole tree — so secrets in `.env` / `posts.db` are never swept into a push.
-Pushing happens at PUBLISH time only; previews are served locally before that.
+  - `git`       : commit to the configured PUBLIC GitHub repo, serve via
+                  raw.githubusercontent.com (the original behaviour).
+  - `git-media` : same repo, but an orphan media branch pushed from a
+                  shallow/partial object store and pruned to a retention
+                  window, so push cost stays flat as posting history grows.
+  - `s3`        : upload to any S3-compatible bucket (AWS, R2, MinIO, ...).
+  - `local`     : copy into a directory served by a tiny local HTTP server —
+                  an offline stand-in for development, tests and benchmarks.
+
+Hosted files get content-hash names (`<sha256[:20]>.jpg`), so republishing
+the same bytes is deduplicated by every backend. Only the git backends need a
+`sync()` (fetch + rebase, or fetch + prune); the others skip it entirely. Sync
+never runs on the generation path: `sync_forever()` runs it periodically in
+the background and it only fetches when `git ls-remote` shows the remote
+branch actually moved.
+
+Important (git): only the explicit image paths are staged (`git add <path>`),
+never the whole tree — so secrets in `.env` / `posts.db` are never swept into
+a push. Publishes that arrive within `HOSTING_BATCH_WINDOW` seconds of each
+other are coalesced into ONE `git add`, ONE commit and ONE push; every waiting
+publish gets its raw URLs once that shared push lands.
 """
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import http.server
+import os
+import shutil
 import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List
-
-from app import rags, settings
-
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-def _git_cfg():
-    return (
-        (rags.get_setting("github_username") or settings.GITHUB_USERNAME),
-        (rags.get_setting("github_repo") or settings.GITHUB_REPO),
-        (rags.get_setting("github_branch") or settings.GITHUB_BRANCH),
-    )
+from app import metrics, rags, settings
 
+try:
+    import boto3
+except Exception:  # S3 backend optional; only needed when selected
+    boto3 = None
 
-def raw_url(local_path: str) -> str:
-    user, repo, branch = _git_cfg()
-    rel = Path(local_path).resolve().relative_to(settings.BASE_DIR).as_posix()
-    return f"https://raw.githubusercontent.com/{user}/{repo}/{branch}/{rel}"
+BACKENDS = ("git", "git-media", "s3", "local")
 
 
 def preview_url(local_path: str) -> str:
@@ -37,70 +58,612 @@ def preview_url(local_path: str) -> str:
     return f"/cdn/{rel}"
 
 
-def _run(args: List[str]) -> None:
-    subprocess.run(args, cwd=str(settings.BASE_DIR), check=True, capture_output=True, text=True)
+def content_name(local_path: str) -> str:
+    """Content-addressed file name: identical bytes -> identical hosted name."""
+    h = hashlib.sha256()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:20] + (Path(local_path).suffix.lower() or ".jpg")
 
 
-def _run_quiet(args: List[str]) -> bool:
-    """Run a git command, swallowing failures. Returns True on success."""
+def _link_or_copy(src: str, dst: Path) -> None:
+    """Place `src` at `dst` (hard link when possible). Existing dst = dedup hit."""
+    if dst.exists():
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
     try:
-        _run(args)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class HostingBackend:
+    """Interface every hosting backend implements."""
+
+    name = "base"
+    needs_sync = False
+
+    def publish(self, paths: List[str], commit_msg: str) -> List[str]:
+        """Make `paths` publicly reachable; return their URLs in order."""
+        raise NotImplementedError
+
+    def sync(self) -> bool:
         return True
-    except subprocess.CalledProcessError:
-        return False
 
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name}
 
-def _push_with_reconcile(branch: str) -> None:
-    """Push to origin; if the remote moved ahead (another copy/session pushed),
-    fetch + rebase our commit on top and retry once.
 
-    Each publish stages uniquely-named slide files, so a rebase can't conflict.
-    If it somehow does, we abort the rebase and surface the original error
-    rather than leaving the repo mid-rebase.
+# ===================== git (GitHub raw) =====================
+
+class _PushBatcher:
+    """Coalesce concurrent publishes into one add/commit/push.
+
+    FastAPI runs the (sync) publish endpoint on a thread pool, so several
+    publishes can be in flight at once. The first caller becomes the leader:
+    it waits `window` seconds for others to queue up, takes the git lock and
+    flushes everything pending in a single round. Publishes that arrive while
+    a push is running queue behind the lock and ride the next flush.
     """
-    if _run_quiet(["git", "push", "origin", branch]):
-        return
-    _run(["git", "fetch", "origin", branch])
-    try:
-        _run(["git", "rebase", f"origin/{branch}"])
-    except subprocess.CalledProcessError:
-        _run_quiet(["git", "rebase", "--abort"])
-        raise
-    _run(["git", "push", "origin", branch])
 
+    def __init__(self, window: float, git_lock: threading.Lock,
+                 flush: Callable[[List[Tuple[List[str], str, Future]]], None]) -> None:
+        self.window = window
+        self._git_lock = git_lock
+        self._flush = flush
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[List[str], str, Future]] = []
+        self._leader = False
 
-def sync() -> bool:
-    """Best-effort pull of remote commits so multiple machines stay in step.
-
-    Called before generation so a laptop that's been idle catches up on what
-    the other one published, leaving the eventual publish-push with little or
-    nothing to reconcile. Never fatal: if offline / no upstream / a rebase
-    would conflict, it cleanly aborts and returns False so generation still
-    proceeds. `--autostash` keeps any local tracked edits safe; untracked
-    preview files are left untouched.
+    def submit(self, paths: List[str], commit_msg: str) -> List[str]:
+        fut: Future = Future()
+        with self._lock:
+            self._pending.append((list(paths), commit_msg, fut))
+            lead, self._leader = not self._leader, True
+        if lead:
+            if self.window > 0:
+                time.sleep(self.window)
+            with self._git_lock:
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    self._leader = False
+                self._flush(batch)
+        return fut.result()
+
+
+class GitBackend(HostingBackend):
+    """Commit slides into a public GitHub repo and serve them via raw URLs."""
+
+    name = "git"
+    needs_sync = True
+
+    def __init__(self, root: Optional[Path] = None, media_dir: str = "images/hosted",
+                 window: Optional[float] = None) -> None:
+        self.root = Path(root or settings.BASE_DIR)
+        self.media_dir = media_dir
+        # Serialises every git operation that touches the index/branch
+        # (publish flushes and sync), so a rebase can never interleave with a commit.
+        self._git_lock = threading.Lock()
+        self._batcher = _PushBatcher(
+            settings.HOSTING_BATCH_WINDOW if window is None else window,
+            self._git_lock, self._flush,
+        )
+        self.last_synced: Optional[str] = None   # ISO time of the last successful check
+        self.remote_head: Optional[str] = None   # remote branch sha seen at that check
+
+    @staticmethod
+    def _cfg():
+        return (
+            (rags.get_setting("github_username") or settings.GITHUB_USERNAME),
+            (rags.get_setting("github_repo") or settings.GITHUB_REPO),
+            (rags.get_setting("github_branch") or settings.GITHUB_BRANCH),
+        )
+
+    def raw_url(self, local_path: str) -> str:
+        user, repo, branch = self._cfg()
+        rel = Path(local_path).resolve().relative_to(self.root).as_posix()
+        return f"https://raw.githubusercontent.com/{user}/{repo}/{branch}/{rel}"
+
+    def _run(self, args: List[str]) -> None:
+        subprocess.run(args, cwd=str(self.root), check=True, capture_output=True, text=True)
+
+    def _run_quiet(self, args: List[str]) -> bool:
+        """Run a git command, swallowing failures. Returns True on success."""
+        try:
+            self._run(args)
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    def _output(self, args: List[str]) -> str:
+        return subprocess.run(
+            args, cwd=str(self.root), check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    def _push_with_reconcile(self, branch: str) -> None:
+        """Push to origin; only if the push was rejected because the remote moved
+        ahead (another copy/session pushed), fetch + rebase our commit on top and
+        retry once. Any other failure (auth, offline) is surfaced as-is.
+
+        Each publish stages uniquely-named slide files, so a rebase can't conflict.
+        If it somehow does, we abort the rebase and surface the original error
+        rather than leaving the repo mid-rebase.
+        """
+        try:
+            self._run(["git", "push", "origin", branch])
+            return
+        except subprocess.CalledProcessError as exc:
+            err = (exc.stderr or "").lower()
+            if not any(m in err for m in ("rejected", "fetch first", "non-fast-forward")):
+                raise
+        self._run(["git", "fetch", "origin", branch])
+        try:
+            self._run(["git", "rebase", f"origin/{branch}"])
+        except subprocess.CalledProcessError:
+            self._run_quiet(["git", "rebase", "--abort"])
+            raise
+        self._run(["git", "push", "origin", branch])
+
+    def _remote_changed(self, branch: str) -> Optional[bool]:
+        """Compare the remote branch head (`ls-remote`, no objects transferred)
+        with our `origin/<branch>` ref. None = remote unreachable."""
+        try:
+            line = self._output(["git", "ls-remote", "origin", f"refs/heads/{branch}"])
+        except subprocess.CalledProcessError:
+            return None
+        head = line.split()[0] if line else ""
+        try:
+            tracked = self._output(["git", "rev-parse", "--verify", "-q", f"origin/{branch}"])
+        except subprocess.CalledProcessError:
+            tracked = ""
+        self.remote_head = head or None
+        return bool(head) and head != tracked
+
+    def sync(self) -> bool:
+        """Best-effort pull of remote commits so multiple machines stay in step.
+
+        Cheap when nothing happened: `ls-remote` first, and fetch + rebase only
+        if the remote branch moved. Never fatal: if offline / no upstream / a
+        rebase would conflict, it cleanly aborts and returns False.
+        `--autostash` keeps any local tracked edits safe; untracked preview
+        files are left untouched.
+        """
+        with metrics.span("hosting.sync"):
+            return self._sync()
+
+    def _sync(self) -> bool:
+        _, _, branch = self._cfg()
+        changed = self._remote_changed(branch)
+        if changed is None:
+            return False
+        if changed:
+            with self._git_lock:
+                if not self._run_quiet(["git", "fetch", "origin", branch]):
+                    return False
+                try:
+                    self._run(["git", "rebase", "--autostash", f"origin/{branch}"])
+                except subprocess.CalledProcessError:
+                    self._run_quiet(["git", "rebase", "--abort"])
+                    return False
+            print(f"[hosting] synced with origin/{branch} ({(self.remote_head or '')[:8]})")
+        self.last_synced = datetime.now(timezone.utc).isoformat()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "last_synced": self.last_synced,
+                "remote_head": self.remote_head}
+
+    def publish(self, paths: List[str], commit_msg: str) -> List[str]:
+        """Blocks until the (possibly shared) push containing these files lands."""
+        return self._batcher.submit(paths, commit_msg)
+
+    def _flush(self, batch: List[Tuple[List[str], str, Future]]) -> None:
+        hosted_dir = self.root / self.media_dir
+        try:
+            hosted = []
+            for paths, _, _ in batch:
+                names = [hosted_dir / content_name(p) for p in paths]
+                for src, dst in zip(paths, names):
+                    _link_or_copy(src, dst)
+                hosted.append([str(n) for n in names])
+            files = list(dict.fromkeys(p for names in hosted for p in names))
+            if len(batch) == 1:
+                message = batch[0][1]
+            else:
+                message = f"Add {len(batch)} carousels\n\n" + "\n".join(f"- {m}" for _, m, _ in batch)
+            _, _, branch = self._cfg()
+            with metrics.span("hosting.push"):
+                self._run(["git", "add", "--", *files])
+                self._run(["git", "commit", "-m", message, "--allow-empty"])
+                self._push_with_reconcile(branch)
+        except subprocess.CalledProcessError as exc:
+            detail = (exc.stderr or exc.stdout or str(exc)).strip()
+            err = RuntimeError(f"Git hosting push failed: {detail}")
+            for _, _, fut in batch:
+                fut.set_exception(err)
+            return
+        except Exception as exc:  # noqa: BLE001 — never leave a waiter hanging
+            for _, _, fut in batch:
+                fut.set_exception(exc)
+            return
+        for names, (_, _, fut) in zip(hosted, batch):
+            fut.set_result([self.raw_url(n) for n in names])
+
+
+# ===================== git orphan media branch =====================
+
+class MediaBranchBackend(HostingBackend):
+    """Slides on a dedicated orphan branch, written without a checkout.
+
+    The app checkout is never touched: a separate bare object store
+    (`.media-git`) talks to the same GitHub repo. It only ever holds the
+    branch tip, fetched with `--depth=1 --filter=blob:none` (trees, no old
+    images), and builds each commit with plumbing (`hash-object`, `mktree`,
+    `commit-tree`). A push therefore uploads just the new slides plus a
+    couple of tree objects, however long the deployment has been posting.
+
+    Layout is `<YYYY-MM-DD>/<sha256[:20]>.jpg`. Instagram copies the image
+    when the media container is created, so dates older than
+    HOSTING_MEDIA_RETENTION_DAYS are dropped by `sync()`, which rewrites the
+    branch as a single parentless commit (force-with-lease) so neither the
+    tree nor the history grows without bound.
     """
-    _, _, branch = _git_cfg()
-    if not _run_quiet(["git", "fetch", "origin", branch]):
-        return False
-    try:
-        _run(["git", "rebase", "--autostash", f"origin/{branch}"])
+
+    name = "git-media"
+    needs_sync = True
+
+    def __init__(self, git_dir: Optional[Path] = None, remote: Optional[str] = None,
+                 branch: Optional[str] = None, window: Optional[float] = None) -> None:
+        self.git_dir = Path(git_dir or settings.BASE_DIR / ".media-git")
+        self._remote = remote if remote is not None else settings.HOSTING_MEDIA_REMOTE
+        self.branch = branch or settings.HOSTING_MEDIA_BRANCH
+        self._git_lock = threading.Lock()
+        self._batcher = _PushBatcher(
+            settings.HOSTING_BATCH_WINDOW if window is None else window,
+            self._git_lock, self._flush,
+        )
+        self._ready = False
+        self.last_synced: Optional[str] = None
+        self.last_squash: Optional[str] = None
+        self.remote_head: Optional[str] = None
+
+    # ---- git plumbing ----
+
+    def _git(self, args: List[str], stdin: Optional[str] = None) -> str:
+        return subprocess.run(
+            ["git", f"--git-dir={self.git_dir}", *args], input=stdin,
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+
+    @property
+    def _tracking(self) -> str:
+        return f"refs/remotes/origin/{self.branch}"
+
+    def _setup(self) -> None:
+        if self._ready:
+            return
+        if not (self.git_dir / "HEAD").exists():
+            remote = self._remote or subprocess.run(
+                ["git", "remote", "get-url", "origin"], cwd=str(settings.BASE_DIR),
+                check=True, capture_output=True, text=True,
+            ).stdout.strip()
+            subprocess.run(["git", "init", "--bare", "-q", str(self.git_dir)],
+                           check=True, capture_output=True)
+            user = GitBackend._cfg()[0] or "media-bot"
+            for key, value in (
+                ("remote.origin.url", remote),
+                ("remote.origin.promisor", "true"),
+                ("remote.origin.partialclonefilter", "blob:none"),
+                ("user.name", user),
+                ("user.email", f"{user}@users.noreply.github.com"),
+            ):
+                self._git(["config", key, value])
+            self._fetch()
+        self._ready = True
+
+    def _fetch(self) -> Optional[str]:
+        """Shallow, blob-less fetch of the branch tip. None = branch not created yet."""
+        try:
+            self._git(["fetch", "-q", "--depth=1", "--filter=blob:none", "origin",
+                       f"+refs/heads/{self.branch}:{self._tracking}"])
+        except subprocess.CalledProcessError as exc:
+            if "couldn't find remote ref" in (exc.stderr or ""):
+                return None
+            raise
+        return self._tip()
+
+    def _tip(self) -> Optional[str]:
+        try:
+            return self._git(["rev-parse", "--verify", "-q", self._tracking]) or None
+        except subprocess.CalledProcessError:
+            return None
+
+    def _entries(self, treeish: str) -> Dict[str, str]:
+        """name -> full `ls-tree` line of one tree level."""
+        try:
+            out = self._git(["ls-tree", treeish])
+        except subprocess.CalledProcessError:
+            return {}
+        return {line.split("\t", 1)[1]: line for line in out.splitlines() if "\t" in line}
+
+    def _mktree(self, entries: Dict[str, str]) -> str:
+        lines = "".join(entries[name] + "\n" for name in sorted(entries))
+        return self._git(["mktree", "--missing"], stdin=lines)
+
+    def _commit(self, files: Dict[str, str], message: str, tip: Optional[str], day: str) -> str:
+        """Commit `files` (name -> blob sha) into directory `day` on top of `tip`."""
+        top = self._entries(tip) if tip else {}
+        sub = self._entries(f"{tip}:{day}") if tip and day in top else {}
+        for name, sha in files.items():
+            sub[name] = f"100644 blob {sha}\t{name}"
+        top[day] = f"040000 tree {self._mktree(sub)}\t{day}"
+        parents = ["-p", tip] if tip else []
+        return self._git(["commit-tree", self._mktree(top), *parents, "-m", message])
+
+    def _push(self, commit: str, lease: Optional[str] = None) -> None:
+        args = ["push", "-q", "origin", f"{commit}:refs/heads/{self.branch}"]
+        if lease is not None:
+            args.insert(1, f"--force-with-lease=refs/heads/{self.branch}:{lease}")
+        self._git(args)
+        self._git(["update-ref", self._tracking, commit])
+        self.remote_head = commit
+
+    def raw_url(self, day: str, name: str) -> str:
+        user, repo, _ = GitBackend._cfg()
+        return f"https://raw.githubusercontent.com/{user}/{repo}/{self.branch}/{day}/{name}"
+
+    # ---- HostingBackend ----
+
+    def publish(self, paths: List[str], commit_msg: str) -> List[str]:
+        return self._batcher.submit(paths, commit_msg)
+
+    def _flush(self, batch: List[Tuple[List[str], str, Future]]) -> None:
+        try:
+            with metrics.span("hosting.push"):
+                self._setup()
+                named = [[(content_name(p), p) for p in paths] for paths, _, _ in batch]
+                files = {name: self._git(["hash-object", "-w", "--", path])
+                         for pairs in named for name, path in pairs}
+                if len(batch) == 1:
+                    message = batch[0][1]
+                else:
+                    message = f"Add {len(batch)} carousels\n\n" + "\n".join(f"- {m}" for _, m, _ in batch)
+                day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+                tip = self._tip()
+                for attempt in range(3):
+                    commit = self._commit(files, message, tip, day)
+                    try:
+                        self._push(commit)
+                        break
+                    except subprocess.CalledProcessError as exc:
+                        err = (exc.stderr or "").lower()
+                        if attempt == 2 or not any(
+                            m in err for m in ("rejected", "fetch first", "non-fast-forward")
+                        ):
+                            raise
+                        tip = self._fetch()  # someone else pushed: rebuild on their tip
+        except subprocess.CalledProcessError as exc:
+            detail = (exc.stderr or exc.stdout or str(exc)).strip()
+            err = RuntimeError(f"Git media push failed: {detail}")
+            for _, _, fut in batch:
+                fut.set_exception(err)
+            return
+        except Exception as exc:  # noqa: BLE001 — never leave a waiter hanging
+            for _, _, fut in batch:
+                fut.set_exception(exc)
+            return
+        for pairs, (_, _, fut) in zip(named, batch):
+            fut.set_result([self.raw_url(day, name) for name, _ in pairs])
+
+    def sync(self) -> bool:
+        with metrics.span("hosting.sync"):
+            try:
+                with self._git_lock:
+                    self._setup()
+                    self._sync()
+            except subprocess.CalledProcessError as exc:
+                print(f"[hosting] media branch sync failed: {(exc.stderr or '').strip()}")
+                return False
+        self.last_synced = datetime.now(timezone.utc).isoformat()
         return True
-    except subprocess.CalledProcessError:
-        _run_quiet(["git", "rebase", "--abort"])
-        return False
+
+    def _sync(self) -> None:
+        line = self._git(["ls-remote", "origin", f"refs/heads/{self.branch}"])
+        head = line.split()[0] if line else None
+        self.remote_head = head
+        tip = self._tip()
+        if head and head != tip:
+            tip = self._fetch()
+        if tip:
+            self._prune(tip)
+
+    def _prune(self, tip: str) -> None:
+        """Drop date directories past the retention window; squash to one commit."""
+        cutoff = (datetime.now(timezone.utc)
+                  - timedelta(days=settings.HOSTING_MEDIA_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        top = self._entries(tip)
+        keep = {day: entry for day, entry in top.items() if day >= cutoff}
+        if len(keep) == len(top):
+            return
+        root = self._git(["commit-tree", self._mktree(keep),
+                          "-m", f"Media since {cutoff} (older slides pruned)"])
+        self._push(root, lease=tip)
+        # Drop the now-unreachable local history too (best effort; no bitmaps,
+        # since a blob-less store never has full closure).
+        try:
+            self._git(["reflog", "expire", "--expire=now", "--all"])
+            self._git(["-c", "repack.writeBitmaps=false", "gc", "-q", "--prune=now"])
+        except subprocess.CalledProcessError as exc:
+            print(f"[hosting] media store gc skipped: {(exc.stderr or '').strip()}")
+        self.last_squash = datetime.now(timezone.utc).isoformat()
+        print(f"[hosting] media branch squashed; pruned {len(top) - len(keep)} day(s) before {cutoff}")
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "branch": self.branch, "last_synced": self.last_synced,
+                "remote_head": self.remote_head, "last_squash": self.last_squash}
+
+
+# ===================== S3-compatible object storage =====================
+
+class S3Backend(HostingBackend):
+    """Upload to an S3-compatible bucket; slides upload concurrently.
+
+    Configured from `.env`: S3_BUCKET, S3_PUBLIC_URL (public base URL of the
+    bucket), optional S3_ENDPOINT_URL (R2/MinIO) and S3_PREFIX. Credentials
+    come from the standard AWS environment variables.
+    """
+
+    name = "s3"
+
+    def __init__(self) -> None:
+        if boto3 is None:
+            raise RuntimeError("S3 hosting needs `boto3` (pip install boto3).")
+        if not settings.S3_BUCKET or not settings.S3_PUBLIC_URL:
+            raise RuntimeError("S3 hosting needs S3_BUCKET and S3_PUBLIC_URL in .env.")
+        self.bucket = settings.S3_BUCKET
+        self.prefix = settings.S3_PREFIX.strip("/")
+        self.public_url = settings.S3_PUBLIC_URL.rstrip("/")
+        self._client = boto3.client("s3", endpoint_url=settings.S3_ENDPOINT_URL or None)
+        self._pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="s3-upload")
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def _upload(self, path: str) -> str:
+        key = self._key(content_name(path))
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=key)  # dedup hit
+        except Exception:
+            self._client.upload_file(
+                path, self.bucket, key,
+                ExtraArgs={"ContentType": "image/jpeg",
+                           "CacheControl": "public, max-age=31536000, immutable"},
+            )
+        return f"{self.public_url}/{key}"
+
+    def publish(self, paths: List[str], commit_msg: str) -> List[str]:
+        try:
+            with metrics.span("hosting.upload"):
+                return list(self._pool.map(self._upload, paths))
+        except Exception as exc:
+            raise RuntimeError(f"S3 hosting upload failed: {exc}") from exc
+
+
+# ===================== local static server (stand-in) =====================
+
+class LocalBackend(HostingBackend):
+    """Copy slides into a local directory and serve it over plain HTTP.
+
+    Instagram cannot fetch from localhost, so this is a stand-in: it lets the
+    whole publish path run offline (dev, tests, benchmarks). When
+    LOCAL_HOSTING_URL is blank a ThreadingHTTPServer is started lazily on
+    127.0.0.1:LOCAL_HOSTING_PORT.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Optional[Path] = None, base_url: Optional[str] = None,
+                 port: Optional[int] = None) -> None:
+        self.root = Path(root or settings.IMAGES_DIR / "hosted")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.port = settings.LOCAL_HOSTING_PORT if port is None else port
+        self._base_url = (base_url if base_url is not None else settings.LOCAL_HOSTING_URL).rstrip("/")
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        if not self._base_url:
+            self.serve()
+        return self._base_url
+
+    def serve(self) -> None:
+        """Start the static file server once (daemon thread)."""
+        with self._lock:
+            if self._server is not None:
+                return
+            handler = functools.partial(_QuietHandler, directory=str(self.root))
+            self._server = http.server.ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+            self.port = self._server.server_address[1]  # resolves port 0
+            self._base_url = f"http://127.0.0.1:{self.port}"
+            threading.Thread(target=self._server.serve_forever, daemon=True,
+                             name="local-hosting").start()
+
+    def publish(self, paths: List[str], commit_msg: str) -> List[str]:
+        with metrics.span("hosting.upload"):
+            names = [content_name(p) for p in paths]
+            for src, name in zip(paths, names):
+                _link_or_copy(src, self.root / name)
+        return [f"{self.base_url}/{n}" for n in names]
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002 — stdlib signature
+        pass
+
+
+# ===================== active backend =====================
+
+_INSTANCES: Dict[str, HostingBackend] = {}
+_OVERRIDE: Optional[HostingBackend] = None
+_INSTANCES_LOCK = threading.Lock()
+
+
+def set_backend(backend: Optional[HostingBackend]) -> None:
+    """Force a backend instance (tests/benchmarks). None = back to settings."""
+    global _OVERRIDE
+    _OVERRIDE = backend
+
+
+def get_backend() -> HostingBackend:
+    """The backend selected in Settings (`hosting_backend`), built once."""
+    if _OVERRIDE is not None:
+        return _OVERRIDE
+    name = (rags.get_setting("hosting_backend") or settings.HOSTING_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        name = "git"
+    with _INSTANCES_LOCK:
+        if name not in _INSTANCES:
+            _INSTANCES[name] = {"git": GitBackend, "git-media": MediaBranchBackend,
+                                "s3": S3Backend, "local": LocalBackend}[name]()
+        return _INSTANCES[name]
+
+
+def needs_sync() -> bool:
+    return get_backend().needs_sync
+
+
+def sync() -> bool:
+    """Reconcile with the remote when the backend has one (git only)."""
+    backend = get_backend()
+    return backend.sync() if backend.needs_sync else True
+
+
+async def sync_forever(interval: float) -> None:
+    """Background loop (started by the API lifespan): keep the git checkout in
+    step with the remote so neither generate nor publish waits on a fetch."""
+    while True:
+        try:
+            if needs_sync():
+                await asyncio.to_thread(sync)
+        except Exception as exc:  # noqa: BLE001 — never kill the loop
+            print(f"[hosting] background sync failed: {exc}")
+        await asyncio.sleep(interval)
+
+
+def status() -> Dict[str, Any]:
+    """Backend status for /api/health. A backend that cannot be built (e.g. s3
+    without a bucket or boto3) is reported, not raised."""
+    try:
+        return get_backend().status()
+    except Exception as exc:  # noqa: BLE001 — health must not fail on this
+        name = (rags.get_setting("hosting_backend") or settings.HOSTING_BACKEND).strip().lower()
+        return {"backend": name, "error": str(exc)}
 
 
 def publish_images(paths: List[str], commit_msg: str = "Add carousel slides") -> List[str]:
-    """Stage, commit and push the given image files; return their raw URLs."""
+    """Host the given image files publicly; return their URLs in order."""
     if not paths:
         return []
-    _, _, branch = _git_cfg()
-    try:
-        for p in paths:
-            _run(["git", "add", p])
-        _run(["git", "commit", "-m", commit_msg, "--allow-empty"])
-        _push_with_reconcile(branch)
-    except subprocess.CalledProcessError as exc:
-        detail = (exc.stderr or exc.stdout or str(exc)).strip()
-        raise RuntimeError(f"Git hosting push failed: {detail}") from exc
-    return [raw_url(p) for p in paths]
+    return get_backend().publish(paths, commit_msg)
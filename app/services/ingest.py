@@ -0,0 +1,95 @@
+"""Background news ingestion into the local article store.
+
+A scheduled worker polls the top-stories feed plus every topic listed in the
+`news_topics` setting, normalises the items and stores them in SQLite
+(`news_articles`, full-text indexed by FTS5). Generation then picks fresh,
+not-yet-posted stories straight from the store — no network on the hot path.
+Publishing a news post marks its story as posted so it is never picked again.
+
+A topic the worker has never seen (or an empty store right after install)
+falls back to one live fetch, whose results are stored for next time.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from app import db, metrics, rags, settings
+from app.services import news
+
+
+def configured_topics() -> List[Optional[str]]:
+    """None (top stories) + the topics from the `news_topics` setting."""
+    raw = (rags.get_setting("news_topics") or "").strip()
+    topics = [t.strip() for t in re.split(r"[,\n]+", raw) if t.strip()]
+    return [None, *dict.fromkeys(topics)]
+
+
+def _normalize(item: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        **item,
+        "url": item.get("link", ""),
+        "link": news.canonical_link(item.get("link", "")),
+        # undated items count as "just seen" so they are not filtered as stale
+        "published_ts": news.published_ts(item.get("published", "")) or time.time(),
+    }
+
+
+def ingest_topic(topic: Optional[str]) -> int:
+    items = news.fetch_news(topic=topic, limit=settings.NEWS_INGEST_PER_TOPIC)
+    return db.upsert_articles([_normalize(it) for it in items], topic=topic or "")
+
+
+def ingest_once() -> int:
+    """Poll every configured topic once; return the number of new articles."""
+    added = 0
+    for topic in configured_topics():
+        try:
+            added += ingest_topic(topic)
+        except Exception as exc:  # noqa: BLE001 — one bad topic must not stop the rest
+            print(f"[ingest] topic {topic or 'top'!r} failed: {exc}")
+    db.prune_articles(time.time() - 3 * settings.NEWS_MAX_AGE_HOURS * 3600)
+    return added
+
+
+async def ingest_forever(interval: float) -> None:
+    """Background loop started by the API lifespan."""
+    while True:
+        try:
+            added = await asyncio.to_thread(ingest_once)
+            if added:
+                print(f"[ingest] stored {added} new articles")
+        except Exception as exc:  # noqa: BLE001 — never kill the loop
+            print(f"[ingest] run failed: {exc}")
+        await asyncio.sleep(interval)
+
+
+def _public(row: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "title": row["title"],
+        "summary": row.get("summary") or row["title"],
+        "source": row.get("source") or "",
+        "link": row["link"],
+        "published": row.get("published") or "",
+    }
+
+
+def pick_fresh(topic: Optional[str], limit: int) -> List[Dict[str, str]]:
+    """Fresh, unposted stories for `topic` from the store (live fetch on a miss).
+
+    Returned `link`s are canonical, so they can be passed back to
+    `db.mark_articles_posted` once a story is published.
+    """
+    since = time.time() - settings.NEWS_MAX_AGE_HOURS * 3600
+    with metrics.span("news.pick"):
+        rows = db.fresh_articles(topic, limit, since)
+    metrics.cache("news_store", len(rows) >= limit)
+    if len(rows) < limit:
+        try:
+            ingest_topic(topic)
+            rows = db.fresh_articles(topic, limit, since)
+        except Exception as exc:  # noqa: BLE001 — serve whatever the store has
+            print(f"[ingest] live fallback for {topic or 'top'!r} failed: {exc}")
+    return [_public(r) for r in rows]
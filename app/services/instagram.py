@@ -9,6 +9,8 @@ from typing import Dict, List, Optional
 
 import requests
 
+from app import metrics
+
 GRAPH = "https://graph.facebook.com/v24.0"
 
 
@@ -40,22 +42,25 @@ def _validate(account: Dict) -> None:
 
 
 def _post(url: str, data: Dict, timeout: int = 30) -> Dict:
-    resp = requests.post(url, data=data, timeout=timeout)
-    body = {}
-    try:
-        body = resp.json()
-    except ValueError:
-        pass
-    if resp.status_code >= 400 or "error" in body:
-        err = body.get("error", {}) if isinstance(body, dict) else {}
-        parts = [str(err.get("message") or resp.text)]
-        if err.get("code") is not None:
-            parts.append(f"code={err.get('code')}")
-        if err.get("error_subcode") is not None:
-            parts.append(f"subcode={err.get('error_subcode')}")
-        if err.get("error_user_msg"):
-            parts.append(str(err.get("error_user_msg")))
-        raise InstagramError("Graph API error: " + " | ".join(parts))
+    # The status/body check is inside the span, so Graph API errors count in
+    # pipeline_stage_errors_total{stage="instagram.graph"}, not only transport ones.
+    with metrics.span("instagram.graph"):
+        resp = requests.post(url, data=data, timeout=timeout)
+        body = {}
+        try:
+            body = resp.json()
+        except ValueError:
+            pass
+        if resp.status_code >= 400 or "error" in body:
+            err = body.get("error", {}) if isinstance(body, dict) else {}
+            parts = [str(err.get("message") or resp.text)]
+            if err.get("code") is not None:
+                parts.append(f"code={err.get('code')}")
+            if err.get("error_subcode") is not None:
+                parts.append(f"subcode={err.get('error_subcode')}")
+            if err.get("error_user_msg"):
+                parts.append(str(err.get("error_user_msg")))
+            raise InstagramError("Graph API error: " + " | ".join(parts))
     return body
 
 
@@ -72,12 +77,15 @@ def fetch_username(account: Dict) -> Optional[str]:
     if not ig_id.isdigit() or _looks_like_placeholder(token):
         return None
     try:
-        r = requests.get(
-            f"{GRAPH}/{ig_id}",
-            params={"fields": "username", "access_token": token},
-            timeout=15,
-        )
-        data = r.json()
+        with metrics.span("instagram.graph"):
+            r = requests.get(
+                f"{GRAPH}/{ig_id}",
+                params={"fields": "username", "access_token": token},
+                timeout=15,
+            )
+            data = r.json()
+            if r.status_code >= 400 or (isinstance(data, dict) and "error" in data):
+                raise InstagramError("Graph API error")  # counted by the span, then swallowed
         username = data.get("username") if isinstance(data, dict) else None
         return str(username).strip() if username else None
     except Exception:
@@ -86,11 +94,12 @@ def fetch_username(account: Dict) -> Optional[str]:
 
 def _permalink(media_id: str, token: str) -> Optional[str]:
     try:
-        r = requests.get(
-            f"{GRAPH}/{media_id}",
-            params={"fields": "permalink", "access_token": token},
-            timeout=15,
-        )
+        with metrics.span("instagram.graph"):
+            r = requests.get(
+                f"{GRAPH}/{media_id}",
+                params={"fields": "permalink", "access_token": token},
+                timeout=15,
+            )
         return r.json().get("permalink")
     except Exception:
         return None
@@ -1,11 +1,15 @@
-"""LLM content generation — OpenAI gpt-4o-mini, ONE batched call per request.
+"""LLM content generation — OpenAI gpt-4o-mini, ONE batched call per shard.
 
-Why one call: every request carries a fixed instruction overhead (the schema +
-rules). Making N separate calls pays that overhead N times. Batching all posts
-and slides into a single structured JSON response amortises the input cost once
-across the whole batch and bounds the (4x more expensive) output via max_tokens.
+Why batched: every request carries a fixed instruction overhead (the schema +
+rules). Making one call per post pays that overhead N times. Batching posts
+and slides into a single structured JSON response amortises the input cost
+across the batch and bounds the (4x more expensive) output via max_tokens.
+A batch larger than one response can hold (LLM_SHARD_SLIDES slides, see
+`shard_posts`) is split by the generator into shards of that size, each one
+call, run concurrently.
 The token usage of each call is returned so the UI can show the input:output
-ratio.  See README "Token economics".
+ratio, including the prompt tokens served from the provider's prefix cache.
+See README "Token economics".
 """
 from __future__ import annotations
 
@@ -13,7 +17,7 @@ import json
 import re
 from typing import Any, Dict, List, Optional
 
-from app import settings
+from app import metrics, settings
 from app.appconfig import load_config
 from app.services import emojis
 
@@ -45,68 +49,92 @@ _SYSTEM = (
 )
 
 
+# Prompts are laid out for provider prompt caching: the invariant rules and
+# JSON schema come first (byte-identical on every call, so after the system
+# message they form a cacheable prefix), and everything that varies per call
+# (counts, topic, avoid list, news items) is appended last under "REQUEST".
+# System + rules are only ~300-350 tokens, under OpenAI's 1024-token caching
+# minimum: only a quotes prompt with a long, unchanged avoid list gets there.
+# News items differ on every call, so news prompts never cache past the rules.
+_QUOTES_RULES = (
+    "Create Instagram CAROUSEL posts for a motivational quotes page.\n"
+    "Each post is a carousel of slides around ONE cohesive theme.\n"
+    "For each post return these fields:\n"
+    '- "title": 2-4 word internal label\n'
+    '- "theme": the central idea in a few words\n'
+    '- "image_query": 3-6 word visual phrase for an aesthetic background photo\n'
+    '- "caption": 1-3 sentence engaging caption with 1-2 natural emojis, NO hashtags inside\n'
+    '- "hashtags": the requested number of lowercase relevant hashtags WITHOUT the # symbol\n'
+    '- "slides": array of EXACTLY the requested number of objects, each with:\n'
+    '    "heading": <=4 word punchy heading (slide 1 must be a scroll-stopping hook),\n'
+    '    "body": an ORIGINAL short quote of the requested length, no author, no emojis, no hashtags,\n'
+    '    "footnote": a short tag or ""\n'
+    "Rules: original content only; vary the themes across posts; "
+    "slide bodies must be emoji-free and hashtag-free; "
+    "never reuse or closely paraphrase a quote from the avoid list.\n"
+    'Return JSON shaped exactly as: {"posts":[ {...} ]}\n'
+)
+
+_NEWS_RULES = (
+    "You are given REAL news items as JSON. Turn the most newsworthy of "
+    "them into Instagram CAROUSEL infographics.\n"
+    "Ground EVERY claim only in the provided items — do not invent facts, numbers, "
+    "or names.\n"
+    "Each post = ONE story expanded into EXACTLY the requested number of slides.\n"
+    "For each post return:\n"
+    '- "title": short internal label\n'
+    '- "item": the "id" of the news item the post is about\n'
+    '- "source": the publisher name from the item\n'
+    '- "image_query": a 2-4 word visual backdrop theme for the story '
+    '(e.g. "middle east diplomacy", "california wildfire", "stock market")\n'
+    '- "caption": 1-2 sentence neutral summary with 1-2 natural emojis, NO hashtags inside\n'
+    '- "hashtags": 8-12 lowercase hashtags WITHOUT the # symbol\n'
+    '- "slides": EXACTLY the requested number of objects, each with "heading", "body", "footnote":\n'
+    '    slide 1 -> heading = hook (<=5 words), body = the headline rephrased clearly,\n'
+    "    middle slides -> heading = 2-3 word label, body = one key point (<=22 words),\n"
+    '    final slide -> heading = "Takeaway", body = a one-sentence takeaway,\n'
+    '    every slide "footnote" = the source name.\n'
+    "Keep slide bodies emoji-free and hashtag-free.\n"
+    'Return JSON shaped exactly as: {"posts":[ {...} ]}\n'
+)
+
+
 def _quotes_prompt(
     posts: int, slides: int, topic: Optional[str],
     min_words: int, max_words: int, max_tags: int, avoid_quotes: List[str],
 ) -> str:
-    about = f" about: {topic}" if topic else ""
-    avoid = ""
-    if avoid_quotes:
-        joined = "; ".join(q.strip() for q in avoid_quotes if q.strip())
-        avoid = (
-            "\nDo NOT reuse or closely paraphrase any of these already-posted quotes:\n"
-            f"{joined}\n"
-        )
-    return (
-        f"Create {posts} Instagram CAROUSEL posts for a motivational quotes page{about}.\n"
-        f"Each post is a carousel of {slides} slides around ONE cohesive theme.\n"
-        "For each post return these fields:\n"
-        '- "title": 2-4 word internal label\n'
-        '- "theme": the central idea in a few words\n'
-        '- "image_query": 3-6 word visual phrase for an aesthetic background photo\n'
-        '- "caption": 1-3 sentence engaging caption with 1-2 natural emojis, NO hashtags inside\n'
-        f'- "hashtags": {max_tags} lowercase relevant hashtags WITHOUT the # symbol\n'
-        f'- "slides": array of EXACTLY {slides} objects, each with:\n'
-        '    "heading": <=4 word punchy heading (slide 1 must be a scroll-stopping hook),\n'
-        f'    "body": an ORIGINAL short quote, {min_words}-{max_words} words, no author, no emojis, no hashtags,\n'
-        '    "footnote": a short tag or ""\n'
-        "Rules: original content only; vary the themes across posts; "
-        "slide bodies must be emoji-free and hashtag-free."
-        f"{avoid}\n"
-        'Return JSON shaped exactly as: {"posts":[ {...} ]}'
-    )
+    # Least volatile first, so consecutive calls share as long a prefix as
+    # possible: config values, the avoid list (changes only on publish),
+    # then topic and counts.
+    request = [
+        f"Quote length: {min_words}-{max_words} words",
+        f"Hashtags per post: {max_tags}",
+    ]
+    joined = "; ".join(q.strip() for q in avoid_quotes if q.strip())
+    if joined:
+        request.append(f"Avoid list (already-posted quotes): {joined}")
+    if topic:
+        request.append(f"Topic: {topic}")
+    request += [f"Slides per post: {slides}", f"Posts: {posts}"]
+    return _QUOTES_RULES + "\nREQUEST\n" + "\n".join(request)
 
 
 def _news_prompt(posts: int, slides: int, items: List[Dict[str, str]]) -> str:
     compact = [
         {
+            "id": n,
             "title": it.get("title", "")[:200],
             "summary": it.get("summary", "")[:320],
             "source": it.get("source", ""),
         }
-        for it in items[: max(posts * 2, posts)]
+        for n, it in enumerate(items[: max(posts * 2, posts)])
     ]
     return (
-        f"You are given REAL news items as JSON. Turn the {posts} most newsworthy of "
-        "them into Instagram CAROUSEL infographics.\n"
-        "Ground EVERY claim only in the provided items — do not invent facts, numbers, "
-        "or names.\n"
-        f"Each post = ONE story expanded into EXACTLY {slides} slides.\n"
-        "For each post return:\n"
-        '- "title": short internal label\n'
-        '- "source": the publisher name from the item\n'
-        '- "image_query": a 2-4 word visual backdrop theme for the story '
-        '(e.g. "middle east diplomacy", "california wildfire", "stock market")\n'
-        '- "caption": 1-2 sentence neutral summary with 1-2 natural emojis, NO hashtags inside\n'
-        '- "hashtags": 8-12 lowercase hashtags WITHOUT the # symbol\n'
-        f'- "slides": EXACTLY {slides} objects, each with "heading", "body", "footnote":\n'
-        '    slide 1 -> heading = hook (<=5 words), body = the headline rephrased clearly,\n'
-        "    middle slides -> heading = 2-3 word label, body = one key point (<=22 words),\n"
-        '    final slide -> heading = "Takeaway", body = a one-sentence takeaway,\n'
-        '    every slide "footnote" = the source name.\n'
-        "Keep slide bodies emoji-free and hashtag-free.\n"
-        'Return JSON shaped exactly as: {"posts":[ {...} ]}\n\n'
-        f"News items:\n{json.dumps(compact, ensure_ascii=False)}"
+        _NEWS_RULES
+        + "\nREQUEST\n"
+        + f"Posts: {posts}\n"
+        + f"Slides per post: {slides}\n"
+        + f"News items:\n{json.dumps(compact, ensure_ascii=False)}"
     )
 
 
@@ -157,9 +185,17 @@ def _normalize_post(raw: Dict[str, Any], slides: int, max_tags: int = 12) -> Dic
         "caption": caption,
         "hashtags": _clean_hashtags(raw.get("hashtags"), limit=max_tags),
         "slides": out_slides,
+        "item": raw["item"] if isinstance(raw.get("item"), int) else None,
     }
 
 
+def shard_posts(slides: int) -> int:
+    """Posts per call: as many as fit LLM_SHARD_SLIDES slides, the amount one
+    response can hold within LLM_MAX_OUTPUT_TOKENS. Larger batches are split
+    into several concurrent calls by the generator."""
+    return max(1, settings.LLM_SHARD_SLIDES // max(1, slides))
+
+
 def generate_batch(
     *,
     niche: str,
@@ -185,16 +221,17 @@ def generate_batch(
 
     client = _get_client()
     try:
-        resp = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": _SYSTEM},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_object"},
-            temperature=temperature,
-            max_tokens=settings.LLM_MAX_OUTPUT_TOKENS,
-        )
+        with metrics.span("llm.generate_batch"):
+            resp = client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": _SYSTEM},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+                temperature=temperature,
+                max_tokens=settings.LLM_MAX_OUTPUT_TOKENS,
+            )
     except Exception as exc:  # network / auth / rate limit
         raise LLMError(f"OpenAI request failed: {exc}") from exc
 
@@ -217,6 +254,11 @@ def generate_batch(
         raise LLMError("Model returned posts without slides.")
 
     usage = resp.usage
+    # Prompt tokens served from the provider's prefix cache (billed at a discount).
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+    metrics.LLM_TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    metrics.LLM_TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+    metrics.LLM_TOKENS.inc("cached", amount=cached)
     return {
         "posts": normalized,
         "model": settings.OPENAI_MODEL,
@@ -224,6 +266,7 @@ def generate_batch(
             "prompt_tokens": getattr(usage, "prompt_tokens", 0),
             "completion_tokens": getattr(usage, "completion_tokens", 0),
             "total_tokens": getattr(usage, "total_tokens", 0),
+            "cached_tokens": cached,
             # input:output ratio — see README "Token economics"
             "io_ratio": round(
                 getattr(usage, "prompt_tokens", 0)
@@ -1,21 +1,42 @@
 """News sourcing for the News niche.
 
-Primary source is Google News RSS (no key, no rate limit, $0). If a News API
-key has been saved in the rags Settings panel, it is used instead with an
-automatic fallback to RSS on any error. Returned items are plain text (HTML
-stripped) so they can be fed straight into the single LLM call as grounding.
+Sources are queried CONCURRENTLY: Google News RSS (no key, $0), the News API
+when a key is saved in the rags Settings panel, and any extra RSS feeds listed
+in the `news_feeds` setting. Each source has its own timeout and the whole
+fan-out is capped by `NEWS_LATENCY_BUDGET`; whatever has arrived by then is
+merged, de-duplicated and ranked by cross-source coverage and recency. A slow
+source never blocks the others (it keeps filling the cache for next time).
+Returned items are plain text (HTML stripped) so they can be fed straight into
+the single LLM call as grounding.
+
+Results are cached per (source, topic) for `NEWS_CACHE_TTL` seconds, so
+repeated previews/generates for one topic are served locally. After the TTL,
+feeds are re-fetched conditionally (ETag / Last-Modified -> 304 reuses the
+parsed items). Every request has an explicit timeout, and items are
+de-duplicated by canonical link and near-identical headline. Headlines are
+matched by word overlap: MinHash band keys put similar headlines in the same
+dict bucket and only bucket-mates are compared, so merging stays linear in the
+number of items instead of comparing every pair.
 """
 from __future__ import annotations
 
 import html
+import math
+import random
 import re
-from typing import Dict, List, Optional
-from urllib.parse import quote_plus
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
 
 import feedparser
 import requests
 
-from app import rags
+from app import metrics, rags, settings
 
 _GOOGLE_SEARCH = (
     "https://news.google.com/rss/search?q={q}&hl=en-US&gl=US&ceid=US:en"
@@ -23,6 +44,28 @@ _GOOGLE_SEARCH = (
 _GOOGLE_TOP = "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en"
 _TAG_RE = re.compile(r"<[^>]+>")
 _UA = {"User-Agent": "Mozilla/5.0 (compatible; InstaNewsBot/1.0)"}
+# Fetch this many items per source regardless of the caller's limit, so one
+# cached fetch can serve previews and generates of any (small) size.
+_FETCH_SIZE = 30
+_TRACKING_PARAMS = re.compile(r"^(utm_|fbclid$|gclid$|ref$|ref_src$|oc$)")
+# Ignored when matching headlines across sources ("A storm hits" == "Storm hits").
+_STOPWORDS = frozenset("a an and as at by for from in is of on or the to with".split())
+# Two headlines are one story when their word sets have Jaccard >= this.
+_TITLE_SIMILARITY = 0.5
+# MinHash LSH: headlines share a bucket if all rows of any band agree. With
+# 10 bands of 2 rows, a pair at Jaccard 0.5 meets in some bucket ~94% of the
+# time (1 - (1 - 0.5**2)**10); pairs at 0.2 only ~33%, and are then rejected.
+_BANDS, _ROWS = 10, 2
+_HASH_P = (1 << 61) - 1
+_HASH_COEFFS = [(r.randrange(1, _HASH_P), r.randrange(_HASH_P))
+                for r in [random.Random(29)] for _ in range(_BANDS * _ROWS)]
+
+_lock = threading.Lock()
+# (source, topic) -> (fetched_at, fetch_size, items)
+_cache: Dict[Tuple[str, str], Tuple[float, int, List[Dict[str, str]]]] = {}
+# url -> validators + parsed items from the last 200 response
+_conditional: Dict[str, Dict[str, Any]] = {}
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news")
 
 
 def _clean(text: str) -> str:
@@ -41,9 +84,142 @@ def _source_from_entry(entry, fallback_title: str) -> str:
     return "Google News"
 
 
+# ===================== dedup =====================
+
+def canonical_link(url: str) -> str:
+    """Scheme/host-insensitive link without tracking params or fragment."""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k.lower())
+    ))
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def _title_key(title: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", (title or "").lower()).strip()
+
+
+def _title_words(title: str) -> FrozenSet[str]:
+    """Headline words: case, punctuation and stopwords ignored."""
+    return frozenset(w for w in _title_key(title).split() if w not in _STOPWORDS)
+
+
+def _band_keys(words: FrozenSet[str]) -> List[Tuple[int, ...]]:
+    """MinHash band keys (band number first) of a word set."""
+    hashes = [zlib.crc32(w.encode()) for w in words]
+    sig = [min((a * h + b) % _HASH_P for h in hashes) for a, b in _HASH_COEFFS]
+    return [(band, *sig[band * _ROWS:(band + 1) * _ROWS]) for band in range(_BANDS)]
+
+
+def _similar(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    return len(a & b) >= _TITLE_SIMILARITY * len(a | b)
+
+
+def _stories(items: List[Dict[str, str]]) -> List[List[int]]:
+    """Indices of items sharing a canonical link or a near-identical headline,
+    grouped in first-seen order (an item joins the earliest matching story)."""
+    groups: List[List[int]] = []
+    by_link: Dict[str, int] = {}
+    buckets: Dict[Tuple[int, ...], List[int]] = {}  # band key -> item indices
+    words = [_title_words(it.get("title", "")) for it in items]
+    gids: List[int] = []
+    for i, it in enumerate(items):
+        link = canonical_link(it.get("link", ""))
+        keys = _band_keys(words[i]) if words[i] else []
+        gid = by_link.get(link) if link else None
+        if gid is None:
+            checked: Set[int] = set()
+            for key in keys:
+                for j in buckets.get(key, ()):
+                    if j not in checked and (gid is None or gids[j] < gid):
+                        checked.add(j)
+                        if _similar(words[i], words[j]):
+                            gid = gids[j]
+        if gid is None:
+            gid = len(groups)
+            groups.append([])
+        groups[gid].append(i)
+        gids.append(gid)
+        if link:
+            by_link.setdefault(link, gid)
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+    return groups
+
+
+def dedupe(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Drop repeats by canonical link or near-identical headline (first wins)."""
+    return [items[group[0]] for group in _stories(items)]
+
+
+def published_ts(value: str) -> Optional[float]:
+    """Epoch seconds from an RSS (RFC 822) or News API (ISO 8601) date."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except ValueError:
+        return None
+
+
+# ===================== fetching =====================
+
+def _conditional_get(url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Optional[requests.Response], Dict[str, Any]]:
+    """GET with If-None-Match / If-Modified-Since from the previous response.
+
+    Returns (response, state); response is None on 304, in which case
+    `state["items"]` still holds what was parsed last time.
+    """
+    key = url + ("?" + urlencode(sorted(params.items())) if params else "")
+    with _lock:
+        state = dict(_conditional.get(key, {}))
+    headers = dict(_UA)
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    resp = requests.get(url, params=params, headers=headers, timeout=settings.NEWS_TIMEOUT)
+    if resp.status_code == 304 and "items" in state:
+        return None, state
+    resp.raise_for_status()
+    state = {
+        "key": key,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+    return resp, state
+
+
+def _remember(state: Dict[str, Any], items: List[Dict[str, str]]) -> None:
+    if state.get("etag") or state.get("last_modified"):
+        with _lock:
+            _conditional[state["key"]] = {**state, "items": items}
+
+
 def _from_rss(topic: Optional[str], limit: int) -> List[Dict[str, str]]:
     url = _GOOGLE_SEARCH.format(q=quote_plus(topic)) if topic else _GOOGLE_TOP
-    feed = feedparser.parse(url)
+    return _from_feed(url, limit)
+
+
+def _from_feed(url: str, limit: int) -> List[Dict[str, str]]:
+    # Fetch with requests (explicit timeout + validators); feedparser only parses.
+    resp, state = _conditional_get(url)
+    if resp is None:
+        return state["items"][:limit]
+    feed = feedparser.parse(resp.content)
     items: List[Dict[str, str]] = []
     for entry in feed.entries[:limit]:
         title = _clean(getattr(entry, "title", ""))
@@ -60,6 +236,7 @@ def _from_rss(topic: Optional[str], limit: int) -> List[Dict[str, str]]:
                 "published": getattr(entry, "published", ""),
             }
         )
+    _remember(state, items)
     return items
 
 
@@ -71,8 +248,9 @@ def _from_newsapi(key: str, topic: Optional[str], limit: int) -> List[Dict[str,
         url = "https://newsapi.org/v2/top-headlines"
         params = {"language": "en", "pageSize": limit, "country": "us"}
     params["apiKey"] = key
-    resp = requests.get(url, params=params, headers=_UA, timeout=10)
-    resp.raise_for_status()
+    resp, state = _conditional_get(url, params)
+    if resp is None:
+        return state["items"][:limit]
     data = resp.json()
     if data.get("status") != "ok":
         raise RuntimeError(data.get("message", "News API error"))
@@ -90,17 +268,111 @@ def _from_newsapi(key: str, topic: Optional[str], limit: int) -> List[Dict[str,
                 "published": art.get("publishedAt", ""),
             }
         )
+    _remember(state, items)
     return items
 
 
-def fetch_news(topic: Optional[str] = None, limit: int = 10) -> List[Dict[str, str]]:
-    """Return up to `limit` news items, newest/most-relevant first."""
+def _cached(source: str, topic: Optional[str], limit: int, fetch) -> List[Dict[str, str]]:
+    """Serve (source, topic) from the TTL cache, fetching on miss/expiry."""
+    key = (source, (topic or "").strip().lower())
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+    if hit and now - hit[0] < settings.NEWS_CACHE_TTL and hit[1] >= limit:
+        metrics.cache("news", True)
+        return hit[2][:limit]
+    metrics.cache("news", False)
+    size = max(limit, _FETCH_SIZE)
+    items = dedupe(fetch(size))
+    if items:
+        with _lock:
+            _cache[key] = (now, size, items)
+    return items[:limit]
+
+
+def _matches_topic(item: Dict[str, str], topic: Optional[str]) -> bool:
+    """Extra feeds are not searchable, so filter their items by topic words."""
+    words = [w for w in _title_key(topic or "").split() if len(w) > 2]
+    if not words:
+        return True
+    text = _title_key(f"{item.get('title', '')} {item.get('summary', '')}")
+    return any(w in text for w in words)
+
+
+def _sources(topic: Optional[str]) -> Dict[str, Any]:
+    """name -> zero-arg callable returning that source's (cached) items."""
+    fetch_size = _FETCH_SIZE
+    sources: Dict[str, Any] = {
+        "google": lambda: _cached("rss", topic, fetch_size, lambda n: _from_rss(topic, n)),
+    }
     key = (rags.get_setting("news_api_key") or "").strip()
     if key:
+        sources["newsapi"] = lambda: _cached(
+            "newsapi", topic, fetch_size, lambda n: _from_newsapi(key, topic, n)
+        )
+    raw = rags.get_setting("news_feeds") or ""
+    for url in dict.fromkeys(u.strip() for u in re.split(r"[\s,]+", raw) if u.strip()):
+        # feeds are topic-agnostic: cache once per URL, filter per request
+        sources[f"feed:{url}"] = (
+            lambda url=url: [it for it in _cached(f"feed:{url}", None, fetch_size,
+                                                  lambda n: _from_feed(url, n))
+                             if _matches_topic(it, topic)]
+        )
+    return sources
+
+
+def _rank(per_source: Dict[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Merge all sources; score = cross-source coverage + recency, best first.
+
+    Coverage counts how many distinct sources carry the story (same canonical
+    link or near-identical headline — a story everyone runs is the story). Recency
+    decays with a 12h half-life. Each story is represented by its newest item.
+    """
+    names = [name for name, items in per_source.items() for _ in items]
+    merged = [it for items in per_source.values() for it in items]
+    now = time.time()
+
+    def recency(it: Dict[str, str]) -> float:
+        ts = published_ts(it.get("published", ""))
+        age_h = max(0.0, (now - ts) / 3600) if ts else 24.0
+        return math.pow(0.5, age_h / 12)
+
+    scored = []
+    for pos, group in enumerate(_stories(merged)):
+        coverage = len({names[i] for i in group})
+        best = max((merged[i] for i in group), key=recency)  # first-seen wins ties
+        scored.append((coverage + recency(best), -pos, best))
+    scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+    return [it for _, _, it in scored]
+
+
+def fetch_news(topic: Optional[str] = None, limit: int = 10) -> List[Dict[str, str]]:
+    """Return up to `limit` news items, best-covered/newest first.
+
+    Never waits longer than `NEWS_LATENCY_BUDGET` (plus the per-source timeout
+    for the very first fetch, if nothing at all has arrived yet).
+    """
+    with metrics.span("news.fetch"):
+        return _fetch_news(topic, limit)
+
+
+def _timed_source(name: str, fn):
+    with metrics.span("news.feed" if name.startswith("feed:") else f"news.{name}"):
+        return fn()
+
+
+def _fetch_news(topic: Optional[str], limit: int) -> List[Dict[str, str]]:
+    futures = {_pool.submit(_timed_source, name, fn): name for name, fn in _sources(topic).items()}
+    done, pending = wait(futures, timeout=settings.NEWS_LATENCY_BUDGET)
+    if not done:  # nothing yet: give the first source to answer its full deadline
+        done, pending = wait(futures, timeout=settings.NEWS_TIMEOUT, return_when="FIRST_COMPLETED")
+    per_source: Dict[str, List[Dict[str, str]]] = {}
+    for fut in done:
+        name = futures[fut]
         try:
-            items = _from_newsapi(key, topic, limit)
-            if items:
-                return items
-        except Exception as exc:  # fall back to RSS, never hard-fail here
-            print(f"[news] News API failed ({exc}); falling back to RSS")
-    return _from_rss(topic, limit)
+            per_source[name] = fut.result()
+        except Exception as exc:  # one failing source never sinks the rest
+            print(f"[news] source {name} failed: {exc}")
+    if pending:
+        print(f"[news] over budget, skipped: {', '.join(futures[f] for f in pending)}")
+    return _rank(per_source)[:limit]
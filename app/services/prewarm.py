@@ -0,0 +1,219 @@
+"""Speculative pre-generation: fully rendered batches kept warm per niche.
+
+Even with the LLM call gone (quote reservoir), scraping and rendering make up
+most of a generate. A background scheduler (API lifespan) therefore keeps
+WARM_BATCHES_PER_NICHE complete batches per niche, built with the current
+default post/slide counts and no topic. A Studio generate with exactly those
+parameters claims one instantly; anything else is generated as before.
+
+Budgets, so speculation never crowds out real work:
+
+  - CPU:    building pauses while an interactive generate runs, while the
+            1-minute load average per core is above WARM_MAX_LOAD, and after
+            each build for long enough that building takes at most
+            WARM_CPU_SHARE of wall time,
+  - tokens: at most WARM_TOKEN_BUDGET LLM tokens per rolling 24 hours.
+
+A warm batch is invalidated (and its files released) when it is older than
+WARM_MAX_AGE_HOURS, when the default counts change, and — for news — as soon
+as one of its headlines ages out of NEWS_MAX_AGE_HOURS or gets posted.
+Its backgrounds are only reserved in the reuse index (bgindex) while it
+waits, recorded when it is claimed and released when it is dropped.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app import db, metrics, settings
+from app.services import bgindex, retention
+
+_lock = threading.Lock()
+_warm: Dict[str, List[Dict[str, Any]]] = {}  # niche -> [{"batch", "posts", "slides"}]
+_spent: Deque[Tuple[float, int]] = deque()  # (ts, tokens) of warm builds, last 24h
+_interactive = 0
+_next_build = 0.0  # monotonic; CPU-share cool-down after a build
+
+
+def enabled() -> bool:
+    return settings.WARM_BATCHES_PER_NICHE > 0
+
+
+@contextmanager
+def interactive() -> Iterator[None]:
+    """Wrap a user-initiated generate: warm builds wait until it finishes."""
+    global _interactive
+    with _lock:
+        _interactive += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _interactive -= 1
+
+
+def _stale_reason(entry: Dict[str, Any], now: float) -> Optional[str]:
+    from app.services import generator
+
+    batch = entry["batch"]
+    max_age = min(settings.WARM_MAX_AGE_HOURS, settings.PREVIEW_TTL_HOURS) * 3600
+    if now - batch["created_ts"] > max_age:
+        return "expired"
+    if (entry["posts"], entry["slides"]) != generator.resolve_params(batch["niche"], None, None)[1:]:
+        return "defaults changed"
+    if batch["niche"] == "news":
+        links = [p["story_link"] for p in batch["posts"] if p.get("story_link")]
+        since = now - settings.NEWS_MAX_AGE_HOURS * 3600
+        if len(db.fresh_links(links, since)) < len(set(links)):
+            return "headline aged out or posted"
+    return None
+
+
+def _drop(entry: Dict[str, Any], reason: str) -> None:
+    batch = entry["batch"]
+    with _lock:
+        pool = _warm.get(batch["niche"], [])
+        if entry in pool:
+            pool.remove(entry)
+    bgindex.release(batch["id"])
+    retention.release(batch["id"])
+    print(f"[prewarm] dropped {batch['niche']} batch {batch['id'][:8]} ({reason})")
+
+
+def claim(niche: str, posts: int, slides: int, topic: Optional[str]) -> Optional[Dict[str, Any]]:
+    """A ready batch matching the request, removed from the pool, or None."""
+    if not enabled():
+        return None
+    if (topic or "").strip():
+        metrics.cache("warm_batch", False)
+        return None
+    now = time.time()
+    with _lock:
+        candidates = [e for e in _warm.get(niche, [])
+                      if e["posts"] == posts and e["slides"] == slides]
+    for entry in candidates:
+        reason = _stale_reason(entry, now)
+        if reason:
+            _drop(entry, reason)
+            continue
+        with _lock:
+            pool = _warm.get(niche, [])
+            if entry not in pool:
+                continue  # claimed concurrently
+            pool.remove(entry)
+        metrics.cache("warm_batch", True)
+        batch = entry["batch"]
+        batch["prewarmed"] = True
+        bgindex.record(batch.get("backgrounds") or [])  # now really in use
+        bgindex.release(batch["id"])
+        return batch
+    metrics.cache("warm_batch", False)
+    return None
+
+
+def discard(batch_id: str) -> None:
+    """Forget a warm batch whose files are going away (retention sweep)."""
+    with _lock:
+        for pool in _warm.values():
+            pool[:] = [e for e in pool if e["batch"]["id"] != batch_id]
+    bgindex.release(batch_id)
+
+
+def _tokens_spent(now: float) -> int:
+    while _spent and _spent[0][0] < now - 86400:
+        _spent.popleft()
+    return sum(t for _, t in _spent)
+
+
+def _may_build() -> Optional[str]:
+    """None if a warm build may start now, else why not."""
+    if _interactive:
+        return "interactive generate running"
+    if time.monotonic() < _next_build:
+        return "cpu share"
+    try:
+        if os.getloadavg()[0] / (os.cpu_count() or 1) > settings.WARM_MAX_LOAD:
+            return "system load"
+    except OSError:  # not available on this platform
+        pass
+    if _tokens_spent(time.time()) >= settings.WARM_TOKEN_BUDGET:
+        return "token budget"
+    return None
+
+
+def _build(niche: str, posts: int, slides: int) -> Dict[str, Any]:
+    """Runs in a worker thread with its own event loop, so rendering never
+    blocks request handling on the main loop. Speculative: no reservoir
+    refill is started on that short-lived loop (refill_forever tops stock up,
+    outside WARM_TOKEN_BUDGET's scope), and backgrounds stay reserved until
+    the batch is claimed."""
+    from app.services import generator
+
+    return asyncio.run(generator.build_batch(niche=niche, posts=posts, slides=slides,
+                                             topic=None, speculative=True))
+
+
+async def fill_once() -> int:
+    """Drop stale warm batches, then build until every niche is full or a
+    budget says stop. Returns the number of batches built."""
+    global _next_build
+    from app.services import generator
+
+    now = time.time()
+    with _lock:
+        entries = [e for pool in _warm.values() for e in pool]
+    for entry in entries:
+        reason = _stale_reason(entry, now)
+        if reason:
+            _drop(entry, reason)
+
+    built = 0
+    for niche in settings.NICHES:
+        while len(_warm.get(niche, [])) < settings.WARM_BATCHES_PER_NICHE:
+            blocked = _may_build()
+            if blocked:
+                if blocked != "cpu share":
+                    print(f"[prewarm] paused: {blocked}")
+                return built
+            _, posts, slides = generator.resolve_params(niche, None, None)
+            cpu0, wall0 = time.process_time(), time.monotonic()
+            try:
+                with metrics.span("prewarm.build"):
+                    batch = await asyncio.to_thread(_build, niche, posts, slides)
+            except Exception as exc:  # noqa: BLE001 — e.g. no fresh news; retry next tick
+                print(f"[prewarm] {niche} build failed: {exc}")
+                break
+            finally:
+                cpu = time.process_time() - cpu0
+                wall = time.monotonic() - wall0
+                share = max(0.01, min(1.0, settings.WARM_CPU_SHARE))
+                _next_build = time.monotonic() + max(0.0, cpu / share - wall)
+            _spent.append((time.time(), int(batch["usage"].get("total_tokens") or 0)))
+            with _lock:
+                _warm.setdefault(niche, []).append(
+                    {"batch": batch, "posts": posts, "slides": slides})
+            built += 1
+            print(f"[prewarm] {niche} batch {batch['id'][:8]} ready ({wall:.1f}s, cpu {cpu:.1f}s)")
+    return built
+
+
+async def prewarm_forever(interval: float) -> None:
+    """Background loop started by the API lifespan."""
+    while enabled():
+        try:
+            await fill_once()
+        except Exception as exc:  # noqa: BLE001 — never kill the loop
+            print(f"[prewarm] tick failed: {exc}")
+        await asyncio.sleep(interval)
+
+
+def status() -> Dict[str, Any]:
+    with _lock:
+        ready = {niche: len(pool) for niche, pool in _warm.items()}
+    return {"enabled": enabled(), "ready": ready,
+            "tokens_24h": _tokens_spent(time.time()), "paused": _may_build()}
@@ -8,17 +8,19 @@ carousel shares one aspect ratio, as the Instagram Graph API requires.
 """
 from __future__ import annotations
 
+import hashlib
 import os
 import textwrap
 from io import BytesIO
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
-from app import settings
+from app import metrics, settings
 from app.appconfig import load_config
+from app.services import bgindex
 from app.services.scraper import download_image_bytes
 
 
@@ -129,6 +131,25 @@ def _cover(img: Image.Image, w: int = CANVAS_W, h: int = CANVAS_H) -> Image.Imag
     return img.crop((left, top, left + w, top + h))
 
 
+def _load_background(data: bytes, w: int = CANVAS_W, h: int = CANVAS_H) -> Image.Image:
+    """Decode a background no larger than `_cover` needs.
+
+    JPEGs use libjpeg's DCT scaling (`draft`, 1/2..1/8) and other formats a
+    fast box `reduce`, both by the largest integer factor that still leaves
+    the image covering (w, h); `_cover` then does the final LANCZOS resize
+    from a much smaller source. `reduce` only handles continuous-tone modes,
+    so palette/bilevel/16-bit images (GIF, palette PNG) are converted first.
+    """
+    img = Image.open(BytesIO(data))
+    img.draft("RGB", (w, h))
+    factor = min(img.size[0] // w, img.size[1] // h)
+    if factor >= 2:
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        img = img.reduce(factor)
+    return img.convert("RGB")
+
+
 def _gradient(palette_idx: int) -> Image.Image:
     top, bottom = _PALETTES[palette_idx % len(_PALETTES)]
     ramp = np.linspace(0, 1, CANVAS_H, dtype="float32")[:, None]
@@ -146,7 +167,7 @@ def _darken(img: Image.Image, amount: float = 0.45) -> Image.Image:
 
 def _render_quote_slide(
     bg: Optional[Image.Image], slide: Dict[str, str], idx: int, total: int,
-    handle: str, palette_idx: int, overlay: Dict,
+    handle: str, palette_idx: int, overlay: Mapping,
 ) -> Image.Image:
     if bg is not None:
         base = _darken(_cover(bg), float(overlay.get("darkness", 0.42)))
@@ -240,35 +261,142 @@ def _draw_footer(draw: ImageDraw.ImageDraw, handle: str, idx: int, total: int, a
     draw.text((x0 + 18, y0 + 12), label, font=pfont, fill=(15, 15, 25))
 
 
+def _render_slide(
+    niche: str, slide: Dict[str, str], idx: int, total: int, handle: str,
+    palette_idx: int, overlay: Mapping, bg: Optional[Image.Image],
+) -> Image.Image:
+    if niche == "news":
+        return _render_infographic_slide(slide, idx, total, handle, palette_idx, bg)
+    return _render_quote_slide(bg, slide, idx, total, handle, palette_idx, overlay)
+
+
+def _jpeg(img: Image.Image, quality: int, *, progressive: bool = False, optimize: bool = False) -> bytes:
+    # Only the pixels are written: no EXIF/ICC/comment is passed to the encoder.
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=optimize, progressive=progressive)
+    return buf.getvalue()
+
+
+def _encode_slide(img: Image.Image, enc: Mapping) -> Tuple[bytes, int, int]:
+    """JPEG bytes for one slide, the quality used, and the size of the first
+    (`max_quality`) encode — the per-slide baseline savings are reported against.
+
+    Optimized Huffman tables + progressive scans at `max_quality`; if that is
+    over `max_bytes`, binary-search the highest quality that fits (never below
+    `min_quality`). Typical slides fit on the first encode.
+    """
+    hi, lo = int(enc.get("max_quality", 92)), int(enc.get("min_quality", 75))
+    budget = int(enc.get("max_bytes") or 0)
+    opts = {"progressive": bool(enc.get("progressive", True)), "optimize": True}
+    data = _jpeg(img, hi, **opts)
+    first = len(data)
+    if not budget or first <= budget or lo >= hi:
+        return data, hi, first
+    best: Optional[Tuple[bytes, int]] = None
+    floor: Optional[bytes] = None
+    low, high = lo, hi - 1
+    while low <= high:
+        q = (low + high) // 2
+        trial = _jpeg(img, q, **opts)
+        if q == lo:
+            floor = trial
+        if len(trial) <= budget:
+            best, low = (trial, q), q + 1
+        else:
+            high = q - 1
+    if best is not None:
+        return (*best, first)
+    return (floor if floor is not None else _jpeg(img, lo, **opts)), lo, first
+
+
+def _save_preview(img: Image.Image, out_dir: Path, enc: Mapping) -> Optional[Path]:
+    """Small WebP derivative for the Studio, named by its content hash so /cdn
+    can serve it as immutable. None when previews are disabled."""
+    width = int(enc.get("preview_width") or 0)
+    if width <= 0:
+        return None
+    small = img.resize((width, round(width * CANVAS_H / CANVAS_W)), Image.BILINEAR)
+    buf = BytesIO()
+    small.save(buf, format="WEBP", quality=int(enc.get("preview_quality", 70)), method=4)
+    data = buf.getvalue()
+    path = out_dir / f"{hashlib.sha256(data).hexdigest()[:20]}.webp"
+    if not path.exists():
+        path.write_bytes(data)
+    return path
+
+
 # ===================== public API =====================
 
 def render_post_slides(
     *, post: Dict, niche: str, out_dir: Path, post_id: str,
     background_urls: Optional[List[str]] = None, handle: Optional[str] = None,
-    palette_idx: int = 0,
+    palette_idx: int = 0, stats: Optional[Dict[str, int]] = None,
+    previews: Optional[List[str]] = None, backgrounds: Optional[List[Tuple[str, int]]] = None,
 ) -> List[str]:
-    """Render all slides for one post; return saved JPEG file paths in order."""
+    """Render all slides for one post; return saved JPEG file paths in order.
+
+    `stats`, if given, accumulates `slides`, `bytes`, `baseline_bytes` (the
+    first `max_quality` encode of each slide, no extra encode), `quality` (sum
+    of the JPEG qualities used) and `over_budget` (slides that had to drop
+    below `max_quality` to fit `max_bytes`).
+    `previews`, if given, receives one Studio preview path per slide (the
+    WebP derivative, or the JPEG itself when derivatives are disabled).
+    Backgrounds drawn are recorded in the reuse index (bgindex), unless a
+    `backgrounds` list is given: then their (url, dhash) entries are appended
+    to it and recording is left to the caller."""
     out_dir.mkdir(parents=True, exist_ok=True)
-    overlay = load_config()["overlay"]
+    config = load_config()
+    overlay, enc = config["overlay"], config["encoding"]
     handle = handle or overlay.get("handle") or settings.DEFAULT_HANDLE
     slides = post.get("slides", [])
-    bgs: List[Optional[Image.Image]] = []
-    if background_urls:  # both niches use backgrounds now
-        for url in background_urls:
-            try:
-                bgs.append(Image.open(BytesIO(download_image_bytes(url))).convert("RGB"))
-            except Exception:
-                bgs.append(None)
+    urls = list(background_urls or [])  # both niches use backgrounds now
+    # Backgrounds are streamed: slide i downloads/decodes its own background
+    # and drops it after rendering, so at most one decoded image is alive.
+    # Only when slides outnumber backgrounds (and cycle) are the compressed
+    # bytes kept for reuse.
+    keep_bytes = 0 < len(urls) < len(slides)
+    raw: Dict[str, Optional[bytes]] = {}
 
     paths: List[str] = []
+    used: List[Tuple[str, int]] = []
     total = len(slides)
     for i, slide in enumerate(slides):
-        bg = bgs[i % len(bgs)] if bgs else None
-        if niche == "news":
-            img = _render_infographic_slide(slide, i, total, handle, palette_idx, bg)
-        else:
-            img = _render_quote_slide(bg, slide, i, total, handle, palette_idx, overlay)
-        path = out_dir / f"slide_{post_id}_{i + 1}.jpg"
-        img.save(path, format="JPEG", quality=92)
+        bg = None
+        if urls:
+            url = urls[i % len(urls)]
+            try:
+                with metrics.span("render.background"):
+                    blob = raw[url] if url in raw else download_image_bytes(url)
+                    if keep_bytes:
+                        raw[url] = blob
+                    if blob is None:
+                        raise ValueError("background unavailable")
+                    bg = _load_background(blob)
+                entry = (url, bgindex.dhash(np.asarray(bg)))
+                if entry not in used:
+                    used.append(entry)
+            except Exception:
+                if keep_bytes:
+                    raw[url] = None
+                bg = None
+        with metrics.span("render.slide"):
+            img = _render_slide(niche, slide, i, total, handle, palette_idx, overlay, bg)
+            path = out_dir / f"slide_{post_id}_{i + 1}.jpg"
+            data, quality, baseline = _encode_slide(img, enc)
+            path.write_bytes(data)
+            if previews is not None:
+                preview = _save_preview(img, out_dir, enc)
+                previews.append(str(preview or path))
+        if stats is not None:
+            stats["slides"] = stats.get("slides", 0) + 1
+            stats["bytes"] = stats.get("bytes", 0) + len(data)
+            stats["baseline_bytes"] = stats.get("baseline_bytes", 0) + baseline
+            stats["quality"] = stats.get("quality", 0) + quality
+            if quality < int(enc.get("max_quality", 92)):
+                stats["over_budget"] = stats.get("over_budget", 0) + 1
         paths.append(str(path))
+    if backgrounds is not None:
+        backgrounds.extend(used)
+    else:
+        bgindex.record(used)  # keep these out of later scrapes
     return paths
@@ -0,0 +1,178 @@
+"""Reservoir of pre-generated quote posts, so quotes generate skips the LLM.
+
+Quote content does not go stale the way headlines do, so it is generated
+ahead of time and stored in SQLite (`quote_reservoir`) per topic: whole
+normalized posts (title, theme, image_query, caption, hashtags, slides),
+generated at RESERVOIR_SLIDES and de-duplicated against posted quotes and
+against everything already in stock. Only posts with exactly RESERVOIR_SLIDES
+unique slides are stored, so everything counted as stock can serve a default
+request.
+
+`take` serves a batch straight from stock, truncating each post to the
+requested slide count (requests for more slides than stocked are left to
+the live call), and re-checks every slide against the posted-quote
+history (quotes published since the fill are skipped). A post that falls
+below RESERVOIR_SLIDES fresh slides leaves the stock — served if it still
+covers the request, deleted otherwise — so it never props up the stock count
+that `ensure` and `refill` go by; any shortfall is generated live by the
+caller.
+When a topic falls below RESERVOIR_LOW_WATER, `ensure` starts a refill in
+the background; `refill_forever` (API lifespan) tops up the no-topic stock
+and every topic requested in the last week, every RESERVOIR_INTERVAL.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app import db, metrics, settings
+from app.appconfig import load_config
+from app.services import llm
+
+_lock = threading.Lock()
+_refilling: Set[str] = set()
+_demand: Dict[str, float] = {}  # topic key -> last request
+_tasks: Set[asyncio.Task] = set()
+_DEMAND_WINDOW = 7 * 86400.0
+
+
+def enabled() -> bool:
+    return settings.RESERVOIR_TARGET > 0
+
+
+def topic_key(topic: Optional[str]) -> str:
+    return " ".join((topic or "").lower().split())
+
+
+def _stock_slides() -> int:
+    return max(1, min(settings.RESERVOIR_SLIDES, settings.MAX_SLIDES_PER_POST))
+
+
+def _norms(post: Dict[str, Any]) -> List[str]:
+    return [db.normalize_quote(s.get("body", "")) for s in post.get("slides", [])]
+
+
+def take(topic: Optional[str], posts: int, slides: int,
+         used_norms: Set[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Up to `posts` stored posts with `slides` fresh slides each, removed
+    from stock. Returns (posts, model they were generated with)."""
+    key = topic_key(topic)
+    _demand[key] = time.time()
+    chosen: List[Tuple[int, Dict[str, Any]]] = []
+    spent: List[int] = []
+    seen: Set[str] = set()
+    model = None
+    stock_slides = _stock_slides()
+    for row in db.reservoir_posts(key):
+        if len(chosen) >= posts:
+            break
+        post = row["post"]
+        fresh = [s for s, n in zip(post["slides"], _norms(post))
+                 if n and n not in used_norms and n not in seen]
+        if len(fresh) < min(slides, stock_slides):
+            spent.append(row["id"])  # quotes posted since the fill: no longer a full post
+            continue
+        if len(fresh) < slides:
+            continue  # a full post; only this request wants more than is stocked
+        post["slides"] = fresh[:slides]
+        seen.update(_norms(post))
+        chosen.append((row["id"], post))
+        model = model or row["model"]
+    db.claim_reservoir_posts(spent)
+    claimed = set(db.claim_reservoir_posts([rid for rid, _ in chosen]))
+    out = [post for rid, post in chosen if rid in claimed]
+    metrics.cache("quote_reservoir", len(out) >= posts)
+    return out, model
+
+
+def refill(topic: str) -> int:
+    """Top `topic` (a topic key) up to RESERVOIR_TARGET; return posts added."""
+    stock = db.reservoir_posts(topic)
+    need = settings.RESERVOIR_TARGET - len(stock)
+    if need <= 0:
+        return 0
+    history_depth = int(load_config()["quote"]["dedupe_history"])
+    taken = db.get_used_quote_norms()
+    stocked = [s.get("body", "") for row in stock for s in row["post"]["slides"]]
+    taken.update(db.normalize_quote(q) for q in stocked)
+    # Posted history first, then the stock (which changes on every take and
+    # refill), so the history part of the prompt prefix stays byte-identical.
+    avoid = (db.get_recent_quote_texts(limit=history_depth) + stocked)[:history_depth]
+
+    added = 0
+    slides = _stock_slides()
+    per_call = llm.shard_posts(slides)
+    for _ in range(math.ceil(need / per_call)):
+        with metrics.span("reservoir.refill"):
+            result = llm.generate_batch(
+                niche="quotes", posts=min(need - added, per_call),
+                slides=slides, topic=topic or None, avoid_quotes=avoid,
+            )
+        fresh = []
+        for post in result["posts"]:
+            kept, norms = [], set()
+            for s in post["slides"]:
+                norm = db.normalize_quote(s.get("body", ""))
+                if norm and norm not in taken and norm not in norms:
+                    norms.add(norm)
+                    kept.append(s)
+            if len(kept) < slides:
+                continue  # partly duplicate: could never serve a default request
+            post["slides"] = kept[:slides]
+            taken.update(_norms(post))
+            fresh.append(post)
+        db.add_reservoir_posts(topic, fresh, result["model"], time.time())
+        added += len(fresh)
+        if not fresh or added >= need:
+            break
+    print(f"[reservoir] topic {topic or '(none)'!r}: +{added} posts")
+    return added
+
+
+def _refill_guarded(topic: str) -> None:
+    with _lock:
+        if topic in _refilling:
+            return
+        _refilling.add(topic)
+    try:
+        refill(topic)
+    except Exception as exc:  # noqa: BLE001 — stock stays as is; generate falls back to live
+        print(f"[reservoir] refill of {topic or '(none)'!r} failed: {exc}")
+    finally:
+        with _lock:
+            _refilling.discard(topic)
+
+
+def ensure(topic: Optional[str]) -> None:
+    """Start a background refill if `topic` is below the low-water mark.
+    Must be called from the event loop (generator.generate)."""
+    key = topic_key(topic)
+    if key in _refilling or db.reservoir_counts().get(key, 0) >= settings.RESERVOIR_LOW_WATER:
+        return
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(_refill_guarded, key))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _wanted_topics() -> List[str]:
+    cutoff = time.time() - _DEMAND_WINDOW
+    return ["", *(k for k, ts in list(_demand.items()) if k and ts >= cutoff)]
+
+
+async def refill_forever(interval: float) -> None:
+    """Background loop started by the API lifespan."""
+    while enabled():
+        for topic in _wanted_topics():
+            await asyncio.to_thread(_refill_guarded, topic)
+        await asyncio.sleep(interval)
+
+
+def status() -> Dict[str, Any]:
+    try:
+        stock = db.reservoir_counts()
+    except Exception:  # noqa: BLE001 — health must not fail on this
+        stock = {}
+    return {"enabled": enabled(), "stock": stock, "refilling": sorted(_refilling)}
@@ -0,0 +1,226 @@
+"""Retention / garbage collection for rendered previews (`images/previews`).
+
+Every generate writes JPEG slides + WebP previews that used to live forever.
+Files are now registered per batch in `preview_files`; a background sweep
+(started by the API lifespan, every PREVIEW_GC_INTERVAL seconds):
+
+  1. adopts files it has never seen (older versions, restarts) using their
+     mtime as creation time, and forgets rows whose files are gone,
+  2. deletes batches older than PREVIEW_TTL_HOURS,
+  3. if the remaining unpublished previews exceed PREVIEW_QUOTA_MB, evicts
+     whole batches, least recently used first (/cdn hits count as use).
+
+A batch's opt-in request profile (`profiles/<batch_id>.folded`) goes with its
+previews — on expiry, eviction and release — and any profile older than
+PREVIEW_TTL_HOURS is pruned too (batches that were published or never
+tracked).
+
+A batch is removed from the in-memory pending store before its files go, so
+a half-deleted batch can never be published. Slides of published posts are
+pinned and never deleted; as a second guard, any file whose name or content
+hash appears in `published_posts` is kept too.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from app import db, metrics, settings
+
+_lock = threading.Lock()
+_accessed: Dict[str, float] = {}  # name -> last /cdn hit, flushed on each sweep
+_last_sweep: Dict[str, Any] = {}
+
+
+def _in_previews(path: Path) -> bool:
+    try:
+        return Path(path).resolve().parent == settings.PREVIEWS_DIR.resolve()
+    except OSError:
+        return False
+
+
+def track(batch_id: str, paths: Iterable[str]) -> None:
+    """Register a batch's freshly rendered preview files."""
+    now = time.time()
+    rows = []
+    for p in paths:
+        try:
+            rows.append((Path(p).name, batch_id, Path(p).stat().st_size, now))
+        except OSError:
+            continue
+    try:
+        db.track_previews(rows)
+    except Exception as exc:
+        print(f"[retention] could not track previews: {exc}")
+
+
+def pin(paths: Iterable[str]) -> None:
+    """Published slides: exempt from TTL and quota for good."""
+    try:
+        db.pin_previews([Path(p).name for p in paths])
+    except Exception as exc:
+        print(f"[retention] could not pin previews: {exc}")
+
+
+def _drop_profile(batch_id: str) -> bool:
+    try:
+        (settings.PROFILES_DIR / f"{batch_id}.folded").unlink()
+        return True
+    except OSError:  # none recorded (the usual case)
+        return False
+
+
+def _prune_profiles(cutoff: float) -> int:
+    if not settings.PROFILES_DIR.is_dir():
+        return 0
+    pruned = 0
+    for path in settings.PROFILES_DIR.glob("*.folded"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                pruned += 1
+        except OSError:
+            continue
+    return pruned
+
+
+def release(batch_id: str) -> int:
+    """Delete a discarded batch's unpinned files now instead of at TTL."""
+    gone = []
+    _drop_profile(batch_id)
+    try:
+        for name in db.batch_preview_names(batch_id):
+            try:
+                (settings.PREVIEWS_DIR / name).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            gone.append(name)
+        db.forget_previews(gone)
+    except Exception as exc:
+        print(f"[retention] could not release batch {batch_id}: {exc}")
+    return len(gone)
+
+
+def touch(path) -> None:
+    """Record a /cdn hit (cheap: memory only until the next sweep)."""
+    if _in_previews(path):
+        with _lock:
+            _accessed[Path(path).name] = time.time()
+
+
+def _is_referenced(path: Path, published: set) -> bool:
+    if path.name in published:
+        return True
+    if path.suffix.lower() in (".jpg", ".jpeg"):
+        from app.services.hosting import content_name
+
+        try:
+            return content_name(str(path)) in published
+        except OSError:
+            return False
+    return False
+
+
+def sweep(now: Optional[float] = None) -> Dict[str, Any]:
+    """One GC pass. Returns counts (also exposed via status())."""
+    from app.services import generator
+
+    now = now if now is not None else time.time()
+    with metrics.span("previews.gc"):
+        with _lock:
+            accessed = dict(_accessed)
+            _accessed.clear()
+        db.touch_previews(accessed)
+
+        on_disk = {p.name: p for p in settings.PREVIEWS_DIR.iterdir() if p.is_file()}
+        rows = {r["name"]: r for r in db.preview_rows()}
+        adopted = []
+        for name, path in on_disk.items():
+            if name not in rows:
+                st = path.stat()
+                adopted.append((name, None, st.st_size, st.st_mtime))
+        db.track_previews(adopted)
+        db.forget_previews([n for n in rows if n not in on_disk])
+        for name, _, size, created in adopted:
+            rows[name] = {"name": name, "batch_id": None, "bytes": size,
+                          "created_at": created, "accessed_at": None, "pinned": 0}
+        rows = {n: r for n, r in rows.items() if n in on_disk}
+
+        # Group unpinned files by batch; untracked orphans are their own group.
+        groups: Dict[str, Dict[str, Any]] = {}
+        for r in rows.values():
+            if r["pinned"]:
+                continue
+            key = r["batch_id"] or f"file:{r['name']}"
+            g = groups.setdefault(key, {"batch_id": r["batch_id"], "names": [], "bytes": 0,
+                                        "created": r["created_at"], "used": 0.0})
+            g["names"].append(r["name"])
+            g["bytes"] += r["bytes"] or 0
+            g["created"] = min(g["created"], r["created_at"])
+            g["used"] = max(g["used"], r["created_at"], r["accessed_at"] or 0.0)
+
+        cutoff = now - settings.PREVIEW_TTL_HOURS * 3600
+        doomed = [g for g in groups.values() if g["created"] < cutoff]
+        kept = sorted((g for g in groups.values() if g["created"] >= cutoff),
+                      key=lambda g: g["used"])
+        quota = settings.PREVIEW_QUOTA_MB * 1024 * 1024
+        total = sum(g["bytes"] for g in kept)
+        evicted = 0
+        while kept and total > quota:
+            g = kept.pop(0)
+            total -= g["bytes"]
+            doomed.append(g)
+            evicted += 1
+
+        published = db.published_file_names() if doomed else set()
+        removed, freed, gone, referenced, profiles = 0, 0, [], [], 0
+        for g in doomed:
+            if g["batch_id"]:
+                generator.drop_batch(g["batch_id"])
+                profiles += _drop_profile(g["batch_id"])
+            for name in g["names"]:
+                path = on_disk[name]
+                if _is_referenced(path, published):
+                    referenced.append(name)
+                    continue
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+                gone.append(name)
+        db.forget_previews(gone)
+        db.pin_previews(referenced)  # published before pinning existed: check once
+        # Pending batches whose previews are past the TTL anyway (e.g. never tracked).
+        generator.expire_batches(cutoff)
+        profiles += _prune_profiles(cutoff)
+
+    stats = {"at": now, "files_removed": removed, "bytes_freed": freed,
+             "batches_expired": len(doomed) - evicted, "batches_evicted": evicted,
+             "unpublished_bytes": total, "profiles_removed": profiles}
+    _last_sweep.clear()
+    _last_sweep.update(stats)
+    if removed:
+        print(f"[retention] removed {removed} preview files ({freed // 1024} KB)")
+    return stats
+
+
+async def gc_forever(interval: float) -> None:
+    """Background loop (started by the API lifespan)."""
+    while True:
+        try:
+            await asyncio.to_thread(sweep)
+        except Exception as exc:  # noqa: BLE001 — never kill the loop
+            print(f"[retention] sweep failed: {exc}")
+        await asyncio.sleep(interval)
+
+
+def status() -> Dict[str, Any]:
+    return dict(_last_sweep)
@@ -10,21 +10,23 @@ import asyncio
 import math
 import random
 import re
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 import requests
-from PIL import Image, ImageOps
+from PIL import Image
+
+from app import metrics, settings
+from app.services import bgindex
 
 try:
     import pytesseract
 except Exception:  # OCR optional; watermark check degrades gracefully
     pytesseract = None
 
-from playwright.sync_api import sync_playwright
-
 DEFAULT_LIMIT = 8
 MIN_WIDTH = 600
 MIN_HEIGHT = 600
@@ -54,47 +56,141 @@ def download_image_bytes(url: str, timeout: int = REQUEST_TIMEOUT) -> bytes:
     return resp.content
 
 
-def _has_text_or_watermark(img: Image.Image, edge_threshold: float = 0.085) -> bool:
-    """Edge-density + OCR heuristic. Returns True if the image likely has text.
+# Every candidate is analysed within one fixed box, aspect ratio kept: the
+# per-image cost is bounded (a 2000px pin costs the same as a 736px one) and
+# ranking only uses relative scores (see _normalize). The edge gate is an
+# absolute threshold, though, calibrated on the full-resolution image: a
+# 1-pixel Canny edge covers ~1/scale times more of a downscaled image, so the
+# gate compares against EDGE_THRESHOLD / scale (see _has_text_or_watermark).
+ANALYSIS_W, ANALYSIS_H = 512, 640
+SCORE_BATCH = 8
+EDGE_THRESHOLD = 0.085  # Canny edge-pixel share at source resolution
+
 
-    Each check fails OPEN (an error means "don't reject"): in particular OCR is
+def _decode_for_analysis(data: bytes) -> Optional[Tuple[int, int, float, np.ndarray]]:
+    """(width, height, scale, uint8 RGB array fitted into the analysis box),
+    or None if the image is below the minimum size. `scale` is analysis/source.
+
+    The size gate only reads the header, and JPEG draft mode lets libjpeg
+    decode straight at 1/2..1/8 scale, so rejected and oversized candidates
+    never pay for a full-resolution decode.
+    """
+    img = Image.open(BytesIO(data))
+    w, h = img.size
+    if w < MIN_WIDTH or h < MIN_HEIGHT:
+        return None
+    scale = min(ANALYSIS_W / w, ANALYSIS_H / h, 1.0)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    img.draft("RGB", size)
+    img = img.convert("RGB")
+    if img.size != size:
+        img = img.resize(size, Image.BOX)
+    return w, h, scale, np.asarray(img)
+
+
+def _laplacian_var(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian (cv2.Laplacian ksize=1), in int16."""
+    g = gray.astype(np.int16)
+    lap = g[1:-1, 2:] + g[1:-1, :-2] + g[2:, 1:-1] + g[:-2, 1:-1]
+    lap -= 4 * g[1:-1, 1:-1]
+    count = lap.size
+    s1 = int(lap.sum(dtype=np.int64))
+    s2 = int(np.einsum("ij,ij->", lap, lap, dtype=np.int64))
+    return s2 / count - (s1 / count) ** 2
+
+
+def _score_batch(arrs: List[np.ndarray]) -> Dict[str, Any]:
+    """Edge density, Laplacian variance and mean HSV saturation for a batch of
+    analysis-size uint8 RGB arrays (sizes may differ: aspect ratios are kept).
+
+    One grayscale buffer per image feeds both Canny and the Laplacian; HSV
+    saturation is read from the uint8 conversion (S = 255*(max-min)/max, the
+    same measure as before without float32 copies of the full image). An image
+    that fails to score gets gray=None and NaN scores; the rest of the batch is
+    unaffected.
+    """
+    n = len(arrs)
+    gray: List[Optional[np.ndarray]] = [None] * n
+    edges, sharpness, saturation = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    for i, arr in enumerate(arrs):
+        try:
+            g = cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+            edges[i] = cv2.countNonZero(cv2.Canny(g, 100, 200)) / g.size
+            saturation[i] = cv2.mean(cv2.cvtColor(arr, cv2.COLOR_RGB2HSV))[1] / 255.0
+            sharpness[i] = _laplacian_var(g)
+            gray[i] = g
+        except Exception as exc:  # noqa: BLE001 — one bad image must not sink the scrape
+            print(f"[scraper] scoring failed for one candidate: {exc}")
+    return {"gray": gray, "edges": edges, "sharpness": sharpness, "saturation": saturation}
+
+
+# Text-region proposal (stage 2): strong local contrast (morphological
+# gradient), joined horizontally into word/line blobs, kept when shaped like a
+# line of text at the analysis size. Smooth photos produce none, so OCR never
+# runs for them.
+_GRADIENT_MIN = 32
+_TEXT_H = (6, 60)
+_ELLIPSE_3 = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+_JOIN_CHARS = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
+
+
+def _text_regions(gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Boxes (x, y, w, h) that look like lines of text."""
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, _ELLIPSE_3)
+    _, mask = cv2.threshold(grad, _GRADIENT_MIN, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _JOIN_CHARS)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    return [
+        (int(x), int(y), int(w), int(h))
+        for x, y, w, h, area in stats[1:]
+        if _TEXT_H[0] <= h <= _TEXT_H[1] and w >= max(20, 2 * h) and area >= 0.45 * w * h
+    ]
+
+
+def _ocr_has_text(gray: np.ndarray, boxes: List[Tuple[int, int, int, int]]) -> bool:
+    """OCR once over the (padded) union of the suspicious boxes."""
+    pad = 8
+    x0 = max(0, min(x for x, _, _, _ in boxes) - pad)
+    y0 = max(0, min(y for _, y, _, _ in boxes) - pad)
+    x1 = min(gray.shape[1], max(x + w for x, _, w, _ in boxes) + pad)
+    y1 = min(gray.shape[0], max(y + h for _, y, _, h in boxes) + pad)
+    with metrics.span("scraper.ocr"):
+        txt = pytesseract.image_to_string(gray[y0:y1, x0:x1]).strip()
+    return len([c for c in txt if c.isalnum()]) >= 4
+
+
+def _has_text_or_watermark(gray: np.ndarray, edge_density: float, scale: float = 1.0) -> bool:
+    """Staged text detector. Returns True if the image likely has text.
+
+    1. edges:   edge density of the analysis image (`scale` = analysis/source)
+                above EDGE_THRESHOLD / scale -> reject outright.
+    2. regions: no text-shaped regions -> accept without OCR (the common case).
+    3. ocr:     Tesseract on the crop around those regions only, at the
+                analysis resolution instead of the full image.
+
+    OCR fails OPEN (an error means "don't reject"): in particular it is
     skipped silently when the Tesseract binary isn't installed, instead of
     rejecting every image.
     """
-    try:
-        gray = np.array(ImageOps.grayscale(img))
-        edges = cv2.Canny(gray, 100, 200)
-        if (np.sum(edges > 0) / edges.size) > edge_threshold:
-            return True
-    except Exception:
-        pass
+    if edge_density > EDGE_THRESHOLD / scale:
+        metrics.WATERMARK_CHECKS.inc("edges", "rejected")
+        return True
+    boxes = _text_regions(gray)
+    if not boxes:
+        metrics.WATERMARK_CHECKS.inc("regions", "passed")
+        return False
     if pytesseract is not None:
         try:
-            txt = pytesseract.image_to_string(img.convert("L")).strip()
-            if len([c for c in txt if c.isalnum()]) >= 4:
-                return True
+            found = _ocr_has_text(gray, boxes)
         except Exception:
             pass  # Tesseract binary missing / OCR failed -> just skip OCR
+        else:
+            metrics.WATERMARK_CHECKS.inc("ocr", "rejected" if found else "passed")
+            return found
+    metrics.WATERMARK_CHECKS.inc("ocr", "skipped")
     return False
 
 
-def _sharpness(img: Image.Image) -> float:
-    try:
-        return float(cv2.Laplacian(np.array(img.convert("L")), cv2.CV_64F).var())
-    except Exception:
-        return 0.0
-
-
-def _saturation(img: Image.Image) -> float:
-    try:
-        arr = np.asarray(img.convert("RGB"), dtype="float32") / 255.0
-        r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
-        mx, mn = np.maximum.reduce([r, g, b]), np.minimum.reduce([r, g, b])
-        return float(np.mean((mx - mn) / (mx + 1e-6)))
-    except Exception:
-        return 0.0
-
-
 def _size_score(w: int, h: int) -> float:
     return math.log1p(w * h) / math.log1p(4000 * 4000)
 
@@ -127,7 +223,10 @@ def _pick_largest_from_srcset(srcset: str) -> Optional[str]:
 
 # ===================== scraping core (sync) =====================
 
-def _scrape_sync(query: str, limit: int, headless: bool) -> List[Dict]:
+def _collect_pin_urls(query: str, limit: int, headless: bool) -> List[str]:
+    """Candidate image URLs from a Pinterest search (up to `limit * 5`)."""
+    from playwright.sync_api import sync_playwright  # heavy; only when scraping
+
     raw: List[str] = []
     seen = set()
     with sync_playwright() as p:
@@ -164,28 +263,65 @@ def _scrape_sync(query: str, limit: int, headless: bool) -> List[Dict]:
             except Exception:
                 continue
         browser.close()
+    return raw
 
-    processed: List[Dict] = []
-    for src in raw:
-        if len(processed) >= limit * 3:
-            break
-        try:
-            img = Image.open(BytesIO(download_image_bytes(src))).convert("RGB")
-            w, h = img.size
-            if w < MIN_WIDTH or h < MIN_HEIGHT or _has_text_or_watermark(img):
-                continue
-            processed.append(
-                {
-                    "url": src,
-                    "width": w,
-                    "height": h,
-                    "sharpness": _sharpness(img),
-                    "saturation": _saturation(img),
-                    "size_score": _size_score(w, h),
-                }
-            )
-        except Exception:
+
+def _fetch_candidate(url: str) -> Optional[Dict]:
+    try:
+        decoded = _decode_for_analysis(download_image_bytes(url))
+    except Exception:
+        return None
+    if decoded is None:
+        return None
+    w, h, scale, arr = decoded
+    phash = bgindex.dhash(arr)
+    if bgindex.is_used_image(phash):  # same picture as a recent background
+        return None
+    return {"url": url, "width": w, "height": h, "scale": scale, "arr": arr, "dhash": phash}
+
+
+def _filter_and_score(batch: List[Dict]) -> List[Dict]:
+    scores = _score_batch([c["arr"] for c in batch])
+    out: List[Dict] = []
+    for i, c in enumerate(batch):
+        if scores["gray"][i] is None:
             continue
+        if _has_text_or_watermark(scores["gray"][i], scores["edges"][i], c["scale"]):
+            continue
+        out.append(
+            {
+                "url": c["url"],
+                "width": c["width"],
+                "height": c["height"],
+                "sharpness": float(scores["sharpness"][i]),
+                "saturation": float(scores["saturation"][i]),
+                "size_score": _size_score(c["width"], c["height"]),
+                "dhash": c["dhash"],
+            }
+        )
+    return out
+
+
+def _scrape_sync(query: str, limit: int, headless: bool) -> List[Dict]:
+    # Recently used images are dropped before download (URL key) and right
+    # after the analysis decode (perceptual hash), so they are never scored.
+    raw = [u for u in _collect_pin_urls(query, limit, headless) if not bgindex.is_used_url(u)]
+    processed: List[Dict] = []
+    seen = bgindex.HashIndex()  # near-duplicates within this search
+    # Download + decode a batch concurrently (I/O and libjpeg release the GIL),
+    # then score the batch together.
+    with ThreadPoolExecutor(max_workers=SCORE_BATCH) as pool:
+        for start in range(0, len(raw), SCORE_BATCH):
+            if len(processed) >= limit * 3:
+                break
+            batch = []
+            for c in pool.map(_fetch_candidate, raw[start:start + SCORE_BATCH]):
+                if c and seen.find(c["dhash"], settings.BG_HASH_DISTANCE) is None:
+                    seen.add(c["dhash"])
+                    batch.append(c)
+            if batch:
+                processed.extend(_filter_and_score(batch))
+    processed = processed[:limit * 3]
 
     if not processed:
         return []
@@ -201,4 +337,5 @@ def _scrape_sync(query: str, limit: int, headless: bool) -> List[Dict]:
 
 async def scrape_backgrounds(query: str, limit: int = DEFAULT_LIMIT, headless: bool = True) -> List[Dict]:
     """Async wrapper safe to call from FastAPI."""
-    return await asyncio.to_thread(_scrape_sync, query, limit, headless)
+    with metrics.span("scraper.scrape"):
+        return await asyncio.to_thread(_scrape_sync, query, limit, headless)
@@ -18,6 +18,7 @@ load_dotenv(BASE_DIR / ".env")
 IMAGES_DIR = BASE_DIR / "images"
 PREVIEWS_DIR = IMAGES_DIR / "previews"
 DB_FILE = BASE_DIR / "posts.db"
+PROFILES_DIR = BASE_DIR / "profiles"   # opt-in request profiles (git-ignored)
 
 IMAGES_DIR.mkdir(exist_ok=True)
 PREVIEWS_DIR.mkdir(exist_ok=True)
@@ -27,18 +28,102 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
 # Hard ceiling so a runaway generation can never burn the budget.
 LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "2200"))
+# Slides (posts x slides) one call returns within LLM_MAX_OUTPUT_TOKENS; a
+# larger batch is split into shards of that size, LLM_CONCURRENCY calls at a
+# time, each shard scraped + rendered RENDER_CONCURRENCY posts at a time.
+LLM_SHARD_SLIDES = int(os.getenv("LLM_SHARD_SLIDES", "36"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
 
-# ---- Public image hosting (GitHub raw) ----------------------------------
-# Defaults here; can be overridden per-deploy via .env or the rags settings.
+# ---- Public image hosting -----------------------------------------------
+# Backend: git (GitHub raw) | git-media (orphan media branch, GitHub raw) |
+# s3 (S3-compatible bucket) | local (offline stand-in). Overridable from the
+# rags settings (`hosting_backend`).
+HOSTING_BACKEND = os.getenv("HOSTING_BACKEND", "git").strip().lower()
+
+# GitHub raw. Defaults here; can be overridden per-deploy via .env or the rags settings.
 GITHUB_USERNAME = os.getenv("GITHUB_USERNAME", "skarthik06").strip()
 GITHUB_REPO = os.getenv("GITHUB_REPO", "instagram_automation").strip()
 GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main").strip()
+# Publishes landing within this many seconds share one commit + push.
+HOSTING_BATCH_WINDOW = float(os.getenv("HOSTING_BATCH_WINDOW", "1.5"))
+# Background git sync period (seconds); a cheap ls-remote unless the remote moved.
+HOSTING_SYNC_INTERVAL = float(os.getenv("HOSTING_SYNC_INTERVAL", "300"))
+# git-media: orphan branch for slides, pushed from a separate shallow/partial
+# object store (.media-git). Blank remote = the app checkout's `origin`.
+# Media older than the retention window is pruned and the branch squashed.
+HOSTING_MEDIA_BRANCH = os.getenv("HOSTING_MEDIA_BRANCH", "media").strip()
+HOSTING_MEDIA_REMOTE = os.getenv("HOSTING_MEDIA_REMOTE", "").strip()
+HOSTING_MEDIA_RETENTION_DAYS = float(os.getenv("HOSTING_MEDIA_RETENTION_DAYS", "7"))
+
+# S3-compatible object storage (AWS S3, Cloudflare R2, MinIO, ...).
+S3_BUCKET = os.getenv("S3_BUCKET", "").strip()
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "").strip()
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "").strip()
+S3_PREFIX = os.getenv("S3_PREFIX", "slides").strip()
+
+# Local static server stand-in (blank URL = serve on 127.0.0.1:PORT).
+LOCAL_HOSTING_URL = os.getenv("LOCAL_HOSTING_URL", "").strip()
+LOCAL_HOSTING_PORT = int(os.getenv("LOCAL_HOSTING_PORT", "8765"))
+
+# ---- News sourcing -------------------------------------------------------
+# Per-(source, topic) result cache lifetime and per-request network timeout.
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "600"))
+NEWS_TIMEOUT = float(os.getenv("NEWS_TIMEOUT", "8"))
+# Overall deadline for the concurrent multi-source fan-out in fetch_news.
+NEWS_LATENCY_BUDGET = float(os.getenv("NEWS_LATENCY_BUDGET", "4"))
+# Background ingestion into the local article store (services/ingest.py).
+NEWS_INGEST_INTERVAL = float(os.getenv("NEWS_INGEST_INTERVAL", "900"))
+NEWS_INGEST_PER_TOPIC = int(os.getenv("NEWS_INGEST_PER_TOPIC", "30"))
+NEWS_MAX_AGE_HOURS = float(os.getenv("NEWS_MAX_AGE_HOURS", "48"))
+
+# ---- Preview retention (services/retention.py) -----------------------------
+# Unpublished previews are deleted after PREVIEW_TTL_HOURS; beyond
+# PREVIEW_QUOTA_MB the least recently used batches go first.
+PREVIEW_TTL_HOURS = float(os.getenv("PREVIEW_TTL_HOURS", "24"))
+PREVIEW_QUOTA_MB = float(os.getenv("PREVIEW_QUOTA_MB", "500"))
+PREVIEW_GC_INTERVAL = float(os.getenv("PREVIEW_GC_INTERVAL", "600"))
+
+# ---- Quote reservoir (services/reservoir.py) -------------------------------
+# Pre-generated quote posts kept per topic so generate skips the LLM call.
+# Below RESERVOIR_LOW_WATER a refill runs in the background; the periodic
+# loop tops every recently requested topic up to RESERVOIR_TARGET (0 = off).
+RESERVOIR_TARGET = int(os.getenv("RESERVOIR_TARGET", "12"))
+RESERVOIR_LOW_WATER = int(os.getenv("RESERVOIR_LOW_WATER", "6"))
+# Slides per stocked post (a request for more is generated live). Kept at the
+# usual default rather than MAX_SLIDES_PER_POST: extra slides cost output
+# tokens and are discarded by shorter requests.
+RESERVOIR_SLIDES = int(os.getenv("RESERVOIR_SLIDES", "4"))
+RESERVOIR_INTERVAL = float(os.getenv("RESERVOIR_INTERVAL", "1800"))
+
+# ---- Warm batches (services/prewarm.py) -----------------------------------
+# Fully rendered batches kept ready per niche (0 = off), checked every
+# WARM_INTERVAL seconds and dropped after WARM_MAX_AGE_HOURS. Building pauses
+# above WARM_MAX_LOAD (1-min load per core), takes at most WARM_CPU_SHARE of
+# wall time and spends at most WARM_TOKEN_BUDGET LLM tokens per 24 hours.
+WARM_BATCHES_PER_NICHE = int(os.getenv("WARM_BATCHES_PER_NICHE", "1"))
+WARM_INTERVAL = float(os.getenv("WARM_INTERVAL", "60"))
+WARM_MAX_AGE_HOURS = float(os.getenv("WARM_MAX_AGE_HOURS", "6"))
+WARM_MAX_LOAD = float(os.getenv("WARM_MAX_LOAD", "0.7"))
+WARM_CPU_SHARE = float(os.getenv("WARM_CPU_SHARE", "0.5"))
+WARM_TOKEN_BUDGET = int(os.getenv("WARM_TOKEN_BUDGET", "20000"))
+
+# ---- Background reuse ----------------------------------------------------
+# A background rendered in the last BG_REUSE_DAYS is not picked again, nor is
+# anything within BG_HASH_DISTANCE bits (dHash Hamming distance) of one.
+BG_REUSE_DAYS = float(os.getenv("BG_REUSE_DAYS", "30"))
+BG_HASH_DISTANCE = int(os.getenv("BG_HASH_DISTANCE", "6"))
 
 # ---- Generation defaults (editable in UI) -------------------------------
 NICHES = ("quotes", "news")
 DEFAULT_POSTS_PER_BATCH = 3
 DEFAULT_SLIDES_PER_POST = 4
-MAX_POSTS_PER_BATCH = 6
-MAX_SLIDES_PER_POST = 6
+# Batches beyond one call's output budget are split into shards (see
+# LLM_SHARD_SLIDES); 10 slides is Instagram's carousel limit.
+MAX_POSTS_PER_BATCH = 50
+MAX_SLIDES_PER_POST = 10
 
 DEFAULT_HANDLE = os.getenv("IG_HANDLE", "sparkle06.exe").strip()
+
+# ---- Profiling (opt-in per request: /api/generate?profile=1) ---------------
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
@@ -0,0 +1,6 @@
+"""Offline benchmarks for the generate/publish pipeline and the renderer.
+
+Run from the repo root, e.g. `python -m bench.pipeline`. Everything external
+(OpenAI, Pinterest, news feeds, GitHub, the Graph API) is replaced by local
+stand-ins from `bench.standins`, so results are reproducible and need no keys.
+"""
@@ -0,0 +1,211 @@
+"""End-to-end pipeline benchmark: generate + publish against local stand-ins.
+
+    python -m bench.pipeline                      # 5 rounds, quotes + news
+    python -m bench.pipeline --runs 10 --posts 6 --slides 6
+    python -m bench.pipeline --save-baseline      # record bench/baseline.json
+    python -m bench.pipeline --llm-latency 1.5    # model a real LLM round trip
+
+Each round runs `generator.generate` for every niche and then publishes every
+post of the batch. The report lists per-stage latency percentiles, slide
+throughput and peak RSS, and compares them against a stored baseline (exit
+code 1 on regression, so it can gate CI).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from bench import standins
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+_samples: Dict[str, List[float]] = defaultdict(list)
+
+
+def _timed(name: str, fn: Callable) -> Callable:
+    """Wrap a sync or async callable so every call records its latency."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def awrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _samples[name].append(time.perf_counter() - t0)
+        return awrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _samples[name].append(time.perf_counter() - t0)
+    return wrapper
+
+
+def _instrument() -> None:
+    from app.services import hosting, ingest, instagram, llm, render, scraper
+
+    for mod, attr, name in (
+        (ingest, "pick_fresh", "news.pick_fresh"),
+        (llm, "generate_batch", "llm.generate_batch"),
+        (scraper, "scrape_backgrounds", "scraper.scrape"),
+        (render, "render_post_slides", "render.post"),
+        (hosting, "publish_images", "hosting.publish"),
+        (instagram, "publish", "instagram.publish"),
+    ):
+        setattr(mod, attr, _timed(name, getattr(mod, attr)))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def _round(niches: List[str], posts: int, slides: int, account_id: int,
+                 fake: standins.FakeLLM) -> int:
+    from app.services import generator
+
+    rendered = 0
+    for niche in niches:
+        fake.posts, fake.slides = posts, slides
+        t0 = time.perf_counter()
+        batch = await generator.generate(niche=niche, posts=posts, slides=slides)
+        _samples[f"generate.{niche}"].append(time.perf_counter() - t0)
+        rendered += sum(len(p["preview_urls"]) for p in batch["posts"])
+        for p in batch["posts"]:
+            t0 = time.perf_counter()
+            generator.publish(batch_id=batch["batch_id"], post_index=p["index"],
+                              account_id=account_id)
+            _samples["publish"].append(time.perf_counter() - t0)
+    return rendered
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    niches = ["quotes", "news"] if args.niche == "both" else [args.niche]
+    with tempfile.TemporaryDirectory(prefix="igbench_") as tmp:
+        env = standins.install(Path(tmp), llm_latency=args.llm_latency, hosting=args.hosting)
+        _instrument()
+        try:
+            # warm-up round (imports, font loading, first connections) not measured
+            asyncio.run(_round(niches, 1, 1, env["account"]["id"], env["llm"]))
+            _samples.clear()
+            t0 = time.perf_counter()
+            slides = 0
+            for _ in range(args.runs):
+                slides += asyncio.run(
+                    _round(niches, args.posts, args.slides, env["account"]["id"], env["llm"])
+                )
+            wall = time.perf_counter() - t0
+        finally:
+            standins.uninstall(env)
+
+    gen_time = sum(sum(v) for k, v in _samples.items() if k.startswith("generate."))
+    return {
+        "config": {"runs": args.runs, "niche": args.niche, "posts": args.posts,
+                   "slides": args.slides, "llm_latency": args.llm_latency,
+                   "hosting": args.hosting},
+        "stages": {
+            name: {"n": len(v), "p50": percentile(v, 50), "p95": percentile(v, 95),
+                   "p99": percentile(v, 99), "max": max(v)}
+            for name, v in sorted(_samples.items())
+        },
+        "slides": slides,
+        "wall_s": wall,
+        "slides_per_sec": slides / gen_time if gen_time else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions (p50/p95 slower or throughput lower than
+    baseline by more than `tolerance`; sub-millisecond noise ignored)."""
+    out: List[str] = []
+    for name, cur in result["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        for q in ("p50", "p95"):
+            if cur[q] > base[q] * (1 + tolerance) and cur[q] - base[q] > 1e-3:
+                out.append(f"{name} {q}: {base[q] * 1e3:.1f}ms -> {cur[q] * 1e3:.1f}ms")
+    base_tp = baseline.get("slides_per_sec") or 0
+    if base_tp and result["slides_per_sec"] < base_tp * (1 - tolerance):
+        out.append(f"throughput: {base_tp:.2f} -> {result['slides_per_sec']:.2f} slides/s")
+    return out
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(f"\n{'stage':<22}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in result["stages"].items():
+        print(f"{name:<22}{s['n']:>5}{s['p50'] * 1e3:>10.1f}{s['p95'] * 1e3:>10.1f}"
+              f"{s['p99'] * 1e3:>10.1f}{s['max'] * 1e3:>10.1f}")
+    rss = result["peak_rss_mb"]
+    print(f"\nslides rendered : {result['slides']}")
+    print(f"throughput      : {result['slides_per_sec']:.2f} slides/s (generate time only)")
+    print(f"wall time       : {result['wall_s']:.2f}s")
+    print(f"peak RSS        : {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--niche", choices=("quotes", "news", "both"), default="both")
+    ap.add_argument("--posts", type=int, default=3)
+    ap.add_argument("--slides", type=int, default=4)
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="simulated LLM seconds")
+    ap.add_argument("--hosting", choices=("git", "local"), default="git")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    ap.add_argument("--json", type=Path, help="also write the raw result here")
+    args = ap.parse_args(argv)
+
+    result = run(args)
+    report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2))
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("\nno baseline yet (run with --save-baseline)")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("config") != result["config"]:
+        print("\nbaseline was recorded with a different config; comparison skipped")
+        return 0
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS vs baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nno regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Rendering micro-benchmark + golden-image regression check.
+
+    python -m bench.render --update      # (re)write bench/golden/*.png
+    python -m bench.render               # time every case, compare to goldens
+    python -m bench.render --repeat 20 --case quote-bg-top
+
+Renders a fixed set of slides straight through `render._render_slide` /
+`render._encode_slide` — quote slides at each overlay position and infographic
+slides, each with and without a background, plus a quote over an oversized
+palette PNG (decoded through `render._load_background`, like a GIF or
+palette-PNG pin) — so font fitting, compositing and JPEG encoding can be
+optimized without the scraper or LLM in the loop.
+
+Per case it reports render and encode ms/slide (median), encoded size, the size
+a plain fixed quality-92 encode would have (the pre-budget baseline; kept here
+rather than on the production render path) and the tracemalloc peak of one render+encode. Pillow allocates pixel buffers in C, out
+of tracemalloc's sight, so that column tracks Python/numpy-side churn only; the
+peak RSS line at the end covers the rest.
+
+Goldens are compared perceptually, not byte-for-byte: both images are reduced
+to 270x338 greyscale and scored with SSIM per 8x8 block; a case fails when its
+*worst* block drops below `--min-ssim` (default 0.85). A mean over the whole
+slide would hide a moved text block behind a mostly-unchanged background;
+the worst block does not, while JPEG noise (~0.99) and one-pixel glyph shifts
+(~0.93) stay above the bar.
+
+Goldens depend on the installed fonts, so generate them with `--update` on the
+machine (or CI image) that runs the comparison. Exit code 1 on any failure,
+including a case with no golden: a run without goldens checks nothing, so it
+must not pass.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from bench import standins
+from bench.pipeline import peak_rss_mb
+
+GOLDEN_DIR = Path(__file__).with_name("golden")
+_COMPARE_SIZE = (270, 338)
+
+_QUOTE = {
+    "heading": "on patience",
+    "body": "Slow progress is still progress. Keep going, even on the days "
+            "it feels like nothing is moving.",
+}
+_NEWS = {
+    "heading": "What happened",
+    "body": "The city council approved a new transit budget on Tuesday, adding "
+            "three bus lines and extending late-night service across the river "
+            "districts starting next spring.",
+    "footnote": "Example Wire",
+}
+
+
+def cases() -> List[Dict[str, Any]]:
+    """Every fixture: quote x {bg, plain} x {top, center, bottom}, news x {bg, plain},
+    and a quote over the palette background."""
+    out: List[Dict[str, Any]] = []
+    for bg in ("photo", None):
+        tag = "bg" if bg else "plain"
+        for position in ("top", "center", "bottom"):
+            out.append({"name": f"quote-{tag}-{position}", "niche": "quotes", "slide": _QUOTE,
+                        "bg": bg, "overlay": {"position": position, "darkness": 0.42,
+                                              "text_color": "#ffffff"}})
+        out.append({"name": f"news-{tag}", "niche": "news", "slide": _NEWS, "bg": bg,
+                    "overlay": {"position": "center"}})
+    out.append({"name": "quote-palette-center", "niche": "quotes", "slide": _QUOTE,
+                "bg": "palette", "overlay": {"position": "center", "darkness": 0.42,
+                                             "text_color": "#ffffff"}})
+    return out
+
+
+def backgrounds() -> Dict[str, Image.Image]:
+    """The decoded backgrounds cases refer to by name."""
+    from app.services import render
+
+    photo = standins.fixture_jpeg(7)
+    # 2x the canvas in P mode, so `_load_background` takes its reduce path.
+    buf = BytesIO()
+    big = Image.open(BytesIO(standins.fixture_jpeg(7, size=(2160, 2700))))
+    big.convert("P", palette=Image.ADAPTIVE, colors=64).save(buf, "PNG")
+    return {"photo": Image.open(BytesIO(photo)).convert("RGB"),
+            "palette": render._load_background(buf.getvalue())}
+
+
+def _render(case: Dict[str, Any], bgs: Dict[str, Image.Image]):
+    from app.services import render
+
+    return render._render_slide(case["niche"], case["slide"], 1, 4, "benchmark",
+                                2, case["overlay"], bgs[case["bg"]] if case["bg"] else None)
+
+
+def _encode(img: Image.Image) -> bytes:
+    from app.appconfig import load_config
+    from app.services import render
+
+    return render._encode_slide(img, load_config()["encoding"])[0]
+
+
+def _q92(img: Image.Image) -> bytes:
+    from app.services import render
+
+    return render._jpeg(img, 92)
+
+
+def _grey(img: Image.Image) -> np.ndarray:
+    return np.asarray(img.convert("L").resize(_COMPARE_SIZE, Image.BILINEAR), dtype="float64")
+
+
+def ssim(a: Image.Image, b: Image.Image, win: int = 8) -> float:
+    """Worst SSIM over non-overlapping win x win blocks of the reduced greyscale images."""
+    x, y = _grey(a), _grey(b)
+    h, w = (x.shape[0] // win) * win, (x.shape[1] // win) * win
+
+    def blocks(arr):
+        return arr[:h, :w].reshape(h // win, win, w // win, win).swapaxes(1, 2).reshape(-1, win * win)
+
+    bx, by = blocks(x), blocks(y)
+    mx, my = bx.mean(1), by.mean(1)
+    vx, vy = bx.var(1), by.var(1)
+    cov = ((bx - mx[:, None]) * (by - my[:, None])).mean(1)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx ** 2 + my ** 2 + c1) * (vx + vy + c2))
+    return float(s.min())
+
+
+def run_case(case: Dict[str, Any], bgs: Dict[str, Image.Image], repeat: int) -> Dict[str, Any]:
+    render_ms: List[float] = []
+    encode_ms: List[float] = []
+    data = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        img = _render(case, bgs)
+        t1 = time.perf_counter()
+        data = _encode(img)
+        render_ms.append((t1 - t0) * 1e3)
+        encode_ms.append((time.perf_counter() - t1) * 1e3)
+
+    tracemalloc.start()
+    _encode(_render(case, bgs))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"render_ms": statistics.median(render_ms), "encode_ms": statistics.median(encode_ms),
+            "bytes": len(data), "q92_bytes": len(_q92(img)), "alloc_kb": peak / 1024,
+            "image": Image.open(BytesIO(data))}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5, help="timed renders per case")
+    ap.add_argument("--case", action="append", help="only run these case names")
+    ap.add_argument("--update", action="store_true", help="write goldens instead of comparing")
+    ap.add_argument("--golden-dir", type=Path, default=GOLDEN_DIR)
+    ap.add_argument("--min-ssim", type=float, default=0.85, help="worst-block SSIM to pass")
+    args = ap.parse_args(argv)
+
+    selected = [c for c in cases() if not args.case or c["name"] in args.case]
+    if not selected:
+        print(f"no such case; choose from: {', '.join(c['name'] for c in cases())}")
+        return 2
+    bgs = backgrounds()
+    _render(selected[0], bgs)  # warm-up: font loading, first-call imports
+
+    failures: List[str] = []
+    print(f"{'case':<22}{'render ms':>11}{'encode ms':>11}{'KB out':>9}{'KB q92':>9}"
+          f"{'alloc KB':>10}{'ssim':>8}")
+    for case in selected:
+        r = run_case(case, bgs, max(1, args.repeat))
+        golden = args.golden_dir / f"{case['name']}.png"
+        score = ""
+        if args.update:
+            args.golden_dir.mkdir(parents=True, exist_ok=True)
+            r["image"].save(golden, format="PNG", optimize=True)
+        elif golden.exists():
+            s = ssim(r["image"], Image.open(golden))
+            score = f"{s:.4f}"
+            if s < args.min_ssim:
+                failures.append(f"{case['name']}: ssim {s:.4f} < {args.min_ssim}")
+        else:
+            score = "missing"
+            failures.append(f"{case['name']}: no golden at {golden} (run with --update)")
+        print(f"{case['name']:<22}{r['render_ms']:>11.1f}{r['encode_ms']:>11.1f}"
+              f"{r['bytes'] / 1024:>9.0f}{r['q92_bytes'] / 1024:>9.0f}{r['alloc_kb']:>10.0f}{score:>8}")
+
+    rss = peak_rss_mb()
+    print(f"\npeak RSS: {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+    if args.update:
+        print(f"goldens written to {args.golden_dir}")
+        return 0
+    if failures:
+        print("\nGOLDEN FAILURES:")
+        for line in failures:
+            print(f"  - {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Local stand-ins for every external dependency of the pipeline.
+
+  - FakeLLM        : drop-in for the OpenAI client (canned JSON, fake usage)
+  - FixtureServer  : one local HTTP server that plays Pinterest images, a news
+                     RSS feed and the Instagram Graph API
+  - make_git_remote: a bare git remote + working clone for the git backend
+
+`install()` wires them all into the app modules for the current process and
+points the DB, previews and hosting at a temp directory, so nothing in the
+real checkout (posts.db, images/, the GitHub remote) is touched.
+"""
+from __future__ import annotations
+
+import http.server
+import itertools
+import json
+import subprocess
+import threading
+import time
+from email.utils import formatdate
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+from PIL import Image
+
+# ===================== fake LLM =====================
+
+
+class FakeLLM:
+    """Mimics `client.chat.completions.create` for the batched JSON call.
+
+    The harness sets `posts`/`slides` before each generate; every quote is
+    unique (global counter) so the de-dup guard never empties a post.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.posts = 3
+        self.slides = 4
+        self._n = itertools.count()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _post(self, i: int) -> Dict[str, Any]:
+        k = next(self._n)
+        return {
+            "title": f"Bench post {k}",
+            "theme": f"steady progress {k}",
+            "item": i,
+            "source": "Bench Wire",
+            "image_query": "calm mountain lake",
+            "caption": f"Benchmark caption number {k} about steady progress.",
+            "hashtags": ["motivation", "growth", "mindset", f"bench{k}"],
+            "slides": [
+                {
+                    "heading": f"Step {s + 1}",
+                    "body": f"Small honest steps every day build quiet strength number {k} {s}",
+                    "footnote": "Bench Wire",
+                }
+                for s in range(self.slides)
+            ],
+        }
+
+    def create(self, **kwargs: Any) -> SimpleNamespace:
+        if self.latency:
+            time.sleep(self.latency)
+        content = json.dumps({"posts": [self._post(i) for i in range(self.posts)]})
+        prompt_chars = sum(len(m["content"]) for m in kwargs.get("messages", []))
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_chars // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=prompt_chars // 4 + len(content) // 4,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage
+        )
+
+
+# ===================== fixture HTTP server =====================
+
+
+def fixture_jpeg(seed: int, size=(1200, 1500)) -> bytes:
+    """A smooth, photo-like JPEG (gradient + soft blobs) that passes the
+    scraper's size and text/watermark filters."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w].astype("float32")
+    base = rng.uniform(40, 200, 3)
+    tint = rng.uniform(-60, 60, 3)
+    img = base + tint * (y / h)[..., None]
+    for _ in range(4):
+        cx, cy, r = rng.uniform(0, w), rng.uniform(0, h), rng.uniform(150, 450)
+        blob = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * r * r))
+        img += blob[..., None] * rng.uniform(-70, 70, 3)
+    buf = BytesIO()
+    Image.fromarray(np.clip(img, 0, 255).astype("uint8"), "RGB").save(buf, "JPEG", quality=88)
+    return buf.getvalue()
+
+
+_WORDS = ("harbor", "senate", "orbit", "vaccine", "drought", "chipmaker", "election",
+          "glacier", "tariff", "stadium", "museum", "pipeline", "satellite", "rally")
+
+
+def _headline(i: int) -> str:
+    """Distinct headlines, so the near-duplicate filter keeps all of them."""
+    a, b = _WORDS[i % len(_WORDS)], _WORDS[(i * 5 + 3) % len(_WORDS)]
+    return f"{a.title()} {b} report {i}"
+
+
+def _rss(n: int) -> bytes:
+    now = time.time()
+    items = "".join(
+        f"<item><title>{_headline(i)} - Bench Wire</title>"
+        f"<link>https://bench.example/story/{i}</link>"
+        f"<description>Summary of developing story {i}.</description>"
+        f"<pubDate>{formatdate(now - i * 600, usegmt=True)}</pubDate></item>"
+        for i in range(n)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>'
+            f"{items}</channel></rss>").encode()
+
+
+class FixtureServer:
+    """Images at /img/<n>.jpg, an RSS feed at /rss, and a Graph API mock at /graph."""
+
+    def __init__(self, images: int = 24) -> None:
+        self.images = {i: fixture_jpeg(i) for i in range(images)}
+        self.rss = _rss(30)
+        self.graph_calls = 0
+        self._ids = itertools.count(1)
+        self._calls = itertools.count(1)
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes, ctype: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # noqa: N802 — stdlib naming
+                path = urlsplit(self.path).path
+                if path.startswith("/img/"):
+                    body = server.images.get(int(Path(path).stem) % len(server.images))
+                    return self._send(200, body, "image/jpeg")
+                if path.startswith("/rss"):
+                    return self._send(200, server.rss, "application/rss+xml")
+                if path.startswith("/graph/"):
+                    server.graph_calls += 1
+                    media = path.rsplit("/", 1)[-1]
+                    body = {"id": media, "username": "bench.handle",
+                            "permalink": f"https://instagram.example/p/{media}"}
+                    return self._send(200, json.dumps(body).encode(), "application/json")
+                self._send(404, b"{}", "application/json")
+
+            def do_POST(self):  # noqa: N802
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                server.graph_calls += 1
+                body = json.dumps({"id": str(next(server._ids))}).encode()
+                self._send(200, body, "application/json")
+
+            def log_message(self, format, *args):  # noqa: A002
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def image_urls(self, query: str, n: int) -> List[str]:
+        """Deterministic per-query slice of the fixture images (Pinterest stand-in).
+
+        Every call gets fresh URLs (`/img/<call>/<n>.jpg`) so the used-background
+        index never exhausts the small fixture set across benchmark rounds."""
+        start = sum(map(ord, query)) % len(self.images)
+        call = next(self._calls)
+        return [f"{self.base}/img/{call}/{(start + i) % len(self.images)}.jpg" for i in range(n)]
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+
+
+# ===================== git remote =====================
+
+
+def _git(cwd: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=str(cwd), check=True, capture_output=True, text=True)
+
+
+def make_git_remote(root: Path, branch: str = "main") -> Path:
+    """Bare remote + working clone with one initial commit; returns the clone."""
+    remote, work = root / "remote.git", root / "work"
+    remote.mkdir(parents=True)
+    _git(remote, "init", "-q", "--bare")
+    work.mkdir()
+    _git(work, "init", "-q", "-b", branch)
+    _git(work, "config", "user.name", "bench")
+    _git(work, "config", "user.email", "bench@localhost")
+    _git(work, "remote", "add", "origin", str(remote))
+    _git(work, "commit", "-q", "--allow-empty", "-m", "init")
+    _git(work, "push", "-q", "origin", branch)
+    return work
+
+
+# ===================== wiring =====================
+
+
+def install(tmp: Path, *, llm_latency: float = 0.0, hosting: str = "git") -> Dict[str, Any]:
+    """Point every external dependency at a local stand-in (this process only)."""
+    from app import crypto, db, rags, settings
+    from app.services import hosting as hosting_mod
+    from app.services import bgindex, instagram, llm, news, scraper
+
+    images_dir = tmp / "images"
+    (images_dir / "previews").mkdir(parents=True)
+    settings.IMAGES_DIR = images_dir
+    settings.PREVIEWS_DIR = images_dir / "previews"
+    db.DB_FILE = tmp / "bench.db"
+    crypto._KEY_FILE = tmp / ".ragskey"
+    crypto._fernet = None
+    db.init_db()
+    rags.invalidate()
+    bgindex.invalidate()
+    settings.BG_HASH_DISTANCE = -1  # fixtures repeat pixels; only URL keys dedupe
+    settings.RESERVOIR_TARGET = 0  # time the full pipeline, LLM call included
+
+    server = FixtureServer()
+    fake = FakeLLM(latency=llm_latency)
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "bench"
+    llm._client = fake
+    scraper._collect_pin_urls = lambda query, limit, headless: server.image_urls(query, limit * 2)
+    news._GOOGLE_TOP = f"{server.base}/rss"
+    news._GOOGLE_SEARCH = f"{server.base}/rss?q={{q}}"
+    instagram.GRAPH = f"{server.base}/graph"
+
+    if hosting == "git":
+        backend: hosting_mod.HostingBackend = hosting_mod.GitBackend(
+            root=make_git_remote(tmp / "git"), window=0
+        )
+    else:
+        backend = hosting_mod.LocalBackend(root=tmp / "hosted", port=0)
+    hosting_mod.set_backend(backend)
+    rags.set_setting("github_branch", "main")
+
+    account = rags.add_account(
+        label="Bench", handle="bench.handle", niche="both",
+        ig_business_id="17841400000000000", ig_access_token="IGQ" + "b" * 120,
+    )
+    return {"server": server, "llm": fake, "backend": backend, "account": account}
+
+
+def uninstall(env: Optional[Dict[str, Any]]) -> None:
+    if env:
+        env["server"].close()
@@ -31,6 +31,8 @@ export default function PostCard({ post, niche, accounts, onPublish }) {
             key={i}
             src={url}
             alt={`Slide ${i + 1}`}
+            loading={i === 0 ? 'eager' : 'lazy'}
+            decoding="async"
             className="absolute inset-0 w-full h-full object-cover transition-opacity duration-300"
             style={{ opacity: i === slide ? 1 : 0 }}
             draggable={false}
@@ -55,9 +55,10 @@ export default function Settings({ accounts, settings, reload, notify }) {
 
   useEffect(() => {
     if (settings) setKeys({
-      news_api_key: '', github_username: settings.github_username || '', github_repo: settings.github_repo || '',
+      news_api_key: '', hosting_backend: settings.hosting_backend || 'git', github_username: settings.github_username || '', github_repo: settings.github_repo || '',
       github_branch: settings.github_branch || '', posts_per_batch: settings.posts_per_batch || 3,
       slides_per_post: settings.slides_per_post || 4, fixed_hashtags: settings.fixed_hashtags || '',
+      news_topics: settings.news_topics || '', news_feeds: settings.news_feeds || '',
     });
   }, [settings]);
 
@@ -163,12 +164,33 @@ export default function Settings({ accounts, settings, reload, notify }) {
             placeholder={settings?.news_api_key_set ? '•••••••• (set)' : 'not set — using free RSS'} />
         </Field>
 
+        <Field label="News topics" hint="Polled in the background (plus top stories) so News generation picks from a local store. Comma separated.">
+          <input className="input" value={keys.news_topics || ''}
+            onChange={(e) => setKeys({ ...keys, news_topics: e.target.value })}
+            placeholder="technology, climate, markets" />
+        </Field>
+
+        <Field label="Extra RSS feeds" hint="Queried concurrently with Google News (and News API when set). Comma separated URLs.">
+          <input className="input font-mono" value={keys.news_feeds || ''}
+            onChange={(e) => setKeys({ ...keys, news_feeds: e.target.value })}
+            placeholder="https://feeds.bbci.co.uk/news/rss.xml" />
+        </Field>
+
         <Field label="Fixed / brand hashtags" hint="Appended to every caption. Space or comma separated, with or without #. Blank = use config.json.">
           <input className="input" value={keys.fixed_hashtags || ''}
             onChange={(e) => setKeys({ ...keys, fixed_hashtags: e.target.value })}
             placeholder="motivation dailyinspiration positivity mindset" />
         </Field>
 
+        <Field label="Image hosting" hint="Where slides are uploaded on publish. Local is an offline stand-in Instagram cannot reach.">
+          <select className="select" value={keys.hosting_backend || 'git'} onChange={(e) => setKeys({ ...keys, hosting_backend: e.target.value })}>
+            <option value="git">GitHub raw (git push)</option>
+            <option value="git-media">GitHub raw (orphan media branch)</option>
+            <option value="s3">S3-compatible bucket</option>
+            <option value="local">Local static server</option>
+          </select>
+        </Field>
+
         <div className="grid md:grid-cols-3 gap-4">
           <Field label="GitHub user"><input className="input font-mono" value={keys.github_username || ''} onChange={(e) => setKeys({ ...keys, github_username: e.target.value })} /></Field>
           <Field label="GitHub repo"><input className="input font-mono" value={keys.github_repo || ''} onChange={(e) => setKeys({ ...keys, github_repo: e.target.value })} /></Field>
@@ -176,8 +198,8 @@ export default function Settings({ accounts, settings, reload, notify }) {
         </div>
 
         <div className="grid md:grid-cols-2 gap-4">
-          <Field label="Default posts / batch"><input className="input" type="number" min="1" max="6" value={keys.posts_per_batch} onChange={(e) => setKeys({ ...keys, posts_per_batch: e.target.value })} /></Field>
-          <Field label="Default slides / post"><input className="input" type="number" min="1" max="6" value={keys.slides_per_post} onChange={(e) => setKeys({ ...keys, slides_per_post: e.target.value })} /></Field>
+          <Field label="Default posts / batch"><input className="input" type="number" min="1" max="50" value={keys.posts_per_batch} onChange={(e) => setKeys({ ...keys, posts_per_batch: e.target.value })} /></Field>
+          <Field label="Default slides / post"><input className="input" type="number" min="1" max="10" value={keys.slides_per_post} onChange={(e) => setKeys({ ...keys, slides_per_post: e.target.value })} /></Field>
         </div>
 
         <div className="flex justify-end">
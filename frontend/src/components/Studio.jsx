@@ -27,7 +27,7 @@ export default function Studio({ accounts, settings, notify }) {
     try {
       const result = await api.generate({ niche, posts: Number(posts), slides: Number(slides), topic: topic.trim() || null });
       setBatches((b) => ({ ...b, [niche]: result }));
-      notify(`Generated ${result.posts.length} ${niche} carousel${result.posts.length > 1 ? 's' : ''} in one LLM call`);
+      notify(`Generated ${result.posts.length} ${niche} carousel${result.posts.length > 1 ? 's' : ''} in ${result.usage?.calls > 1 ? `${result.usage.calls} LLM calls` : 'one LLM call'}`);
     } catch (e) {
       notify(e?.response?.data?.detail || 'Generation failed', 'error');
     } finally {
@@ -79,11 +79,11 @@ export default function Studio({ accounts, settings, notify }) {
           </label>
           <label className="block">
             <span className="label">Posts</span>
-            <input className="input" type="number" min="1" max="6" value={posts} onChange={(e) => setPosts(e.target.value)} />
+            <input className="input" type="number" min="1" max="50" value={posts} onChange={(e) => setPosts(e.target.value)} />
           </label>
           <label className="block">
             <span className="label">Slides</span>
-            <input className="input" type="number" min="1" max="6" value={slides} onChange={(e) => setSlides(e.target.value)} />
+            <input className="input" type="number" min="1" max="10" value={slides} onChange={(e) => setSlides(e.target.value)} />
           </label>
           <button className="btn btn-accent h-[42px]" onClick={generate} disabled={loading}>
             {loading ? <><Spinner size={16} /> Working…</> : <><Icon name="spark" size={16} /> Generate</>}
@@ -103,11 +103,19 @@ export default function Studio({ accounts, settings, notify }) {
           <span style={{ color: 'var(--accent)' }}>◆ token report</span>
           <span>model <b style={{ color: 'var(--text)' }}>{batch.model}</b></span>
           <span>input <b style={{ color: 'var(--text)' }}>{batch.usage.prompt_tokens}</b></span>
+          <span title="Input tokens served from the provider's prompt cache (billed at a discount).">
+            cached <b style={{ color: 'var(--text)' }}>{batch.usage.cached_tokens ?? 0}</b>
+          </span>
           <span>output <b style={{ color: 'var(--text)' }}>{batch.usage.completion_tokens}</b></span>
           <span>total <b style={{ color: 'var(--text)' }}>{batch.usage.total_tokens}</b></span>
           <span title="input ÷ output. Output tokens cost ~4× input on gpt-4o-mini, so a higher ratio = cheaper batch.">
             in:out <b style={{ color: 'var(--accent)' }}>{batch.usage.io_ratio}:1</b>
           </span>
+          {batch.prewarmed && (
+            <span title="Rendered ahead of time by the background pre-warmer.">
+              <b style={{ color: 'var(--accent)' }}>pre-rendered</b>
+            </span>
+          )}
         </div>
       )}
 